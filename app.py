@@ -1,52 +1,31 @@
 import streamlit as st
 import streamlit_authenticator as stauth
-from supabase import create_client
 import os
-from system_monitor import show_system_metrics
-
-# Tab scripts
-from tabs import (
-    community_creation,
-    budget_upload,
-    sage_export,
-    super_request,
-    warehouse_kitting,
-    backorder_kitting,
-    user_management,
-    items_editor,
-    roof_editor,
-    warehouse_manager,
-    addon_kitting,
+from auth import invalidate_credentials, load_credentials
+from supabase_client import get_supabase
+from memory_inspector import track_session
+from perf_metrics import track_rerun
+from system_monitor import (
+    show_memory_inspector, show_query_profile, show_rerun_metrics, show_system_metrics,
+    show_tab_import_times,
 )
+from tab_registry import load_tab
 
 st.set_page_config(page_title="Roofing Pulltag System", layout="wide")
 
 # --- Supabase setup -----------------------------------------------------------
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
-    st.error("❌ Missing SUPABASE_URL or SUPABASE_KEY")
-    st.stop()
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-rows = supabase.table("users").select("username,password,role").execute().data or []
-
-# Build credential dicts
-stauth_credentials = {}
-user_roles = {}
-for u in rows:
-    u_name = u.get("username", "").strip()
-    u_pw   = (u.get("password") or "").replace("\n", "").strip()
-    u_role = (u.get("role")     or "").strip()
-    if u_name and u_pw:
-        stauth_credentials[u_name] = {"name": u_name, "password": u_pw}
-        user_roles[u_name] = u_role
+supabase = get_supabase()  # shared by every session; stops if env is missing
+stauth_credentials, user_roles = load_credentials(supabase)
 
 if not stauth_credentials:
+    invalidate_credentials()  # don't keep an empty result for the whole TTL
     st.error("❌ No valid users in Supabase `users` table.")
     st.stop()
 
 # --- Authenticator setup -----------------------------------------------------
+# Built per rerun on purpose: its cookie manager is a per-session component
+# that has to render every run.  Construction is local; the credentials
+# above come from the process-wide cache.
 authenticator = stauth.Authenticate(
     {"usernames": stauth_credentials},
     cookie_name="roofing_auth",
@@ -80,44 +59,64 @@ st.sidebar.markdown(f"**Logged in as:** `{username}` ({role})")
 authenticator.logout("Log out", "sidebar")
 show_system_metrics(role)
 
-# Define tabs per role
-base_tabs = {
-    "🏘️ Community Creation":      community_creation.run,
-    "📄 Budget Upload":           budget_upload.run,
-    "📊 Sage Export":             sage_export.run,
+# Define tabs per role  (menu label → module path, imported on first open)
+TAB_MODULES = {
+    "🏘️ Community Creation":      "tabs.community_creation",
+    "📄 Budget Upload":           "tabs.budget_upload",
+    "📊 Sage Export":             "tabs.sage_export",
+    "📦 Super Request":           "tabs.super_request",
+    "🛠️ Warehouse Kitting":       "tabs.warehouse_kitting",
+    "🔁 Backorder Kitting":       "tabs.backorder_kitting",
+    "👤 User Management":         "tabs.user_management",
+    "🧾 Items Master Editor":     "tabs.items_editor",
+    "🏠 Roof Types Editor":       "tabs.roof_editor",
+    "🏢 Manage Warehouses":       "tabs.warehouse_manager",
+    "➕ Add-On Kitting":          "tabs.addon_kitting",
 }
 
-exec_tabs = {
-    **base_tabs,
-    "📦 Super Request":        super_request.run,
-    "🛠️ Warehouse Kitting":    warehouse_kitting.run,
-    "🔁 Backorder Kitting":     backorder_kitting.run,
-    "👤 User Management":       user_management.run,
-    "🧾 Items Master Editor":   items_editor.run,
-    "🏠 Roof Types Editor":     roof_editor.run,
-    "🏢 Manage Warehouses":     warehouse_manager.run,
-    "➕ Add-On Kitting":        addon_kitting.run
-}
+base_tabs = [
+    "🏘️ Community Creation",
+    "📄 Budget Upload",
+    "📊 Sage Export",
+]
+
+exec_tabs = [
+    *base_tabs,
+    "📦 Super Request",
+    "🛠️ Warehouse Kitting",
+    "🔁 Backorder Kitting",
+    "👤 User Management",
+    "🧾 Items Master Editor",
+    "🏠 Roof Types Editor",
+    "🏢 Manage Warehouses",
+    "➕ Add-On Kitting",
+]
 
 tabs_by_role = {
     "exec":      exec_tabs,
     "admin":     base_tabs,
-    "super": {
-        "📦 Super Request": super_request.run,
-        "🏘️ Community Creation": community_creation.run,
-    },
-    "warehouse": {
-        "🛠️ Warehouse Kitting": warehouse_kitting.run,
-        "🔁 Backorder Kitting": backorder_kitting.run,
-        "➕ Add-On Kitting": addon_kitting.run,
-    },
+    "super": [
+        "📦 Super Request",
+        "🏘️ Community Creation",
+    ],
+    "warehouse": [
+        "🛠️ Warehouse Kitting",
+        "🔁 Backorder Kitting",
+        "➕ Add-On Kitting",
+    ],
 }
 
-available = tabs_by_role.get(role, {})
+available = tabs_by_role.get(role, [])
 if not available:
     st.error(f"🚫 Role '{role}' has no available tabs.")
     st.stop()
 
 st.sidebar.title("📚 Menu")
-choice = st.sidebar.radio("Go to", list(available.keys()))
-available[choice]()
+choice = st.sidebar.radio("Go to", available)
+run_tab = load_tab(TAB_MODULES[choice])
+show_tab_import_times(role)
+show_rerun_metrics(role)
+show_query_profile(role)
+show_memory_inspector(role)
+with track_rerun(choice, username), track_session(username, choice):
+    run_tab()
@@ -1,10 +1,34 @@
 import streamlit as st
-import requests
 import os
 import bcrypt
+from supabase_client import HTTP_TIMEOUT, get_http_session
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+CREDENTIALS_TTL = int(os.getenv("AUTH_CREDENTIALS_TTL", "60"))
+
+# --- Credential store (process-wide, short TTL) ------------------------------
+@st.cache_data(ttl=CREDENTIALS_TTL, show_spinner=False)
+def load_credentials(_client):
+    """Return ``(stauth_credentials, user_roles)`` built from the ``users`` table.
+
+    Shared by every session, so a rerun costs no users-table round trip.
+    Call ``invalidate_credentials()`` after any change to ``users``.
+    """
+    rows = _client.table("users").select("username,password,role").execute().data or []
+    stauth_credentials, user_roles = {}, {}
+    for u in rows:
+        u_name = (u.get("username") or "").strip()
+        u_pw   = (u.get("password") or "").replace("\n", "").strip()
+        u_role = (u.get("role")     or "").strip()
+        if u_name and u_pw:
+            stauth_credentials[u_name] = {"name": u_name, "password": u_pw}
+            user_roles[u_name] = u_role
+    return stauth_credentials, user_roles
+
+def invalidate_credentials():
+    load_credentials.clear()
+
 
 def login():
     if "user" in st.session_state:
@@ -22,7 +46,7 @@ def login():
             "apikey": SUPABASE_KEY,
             "Authorization": f"Bearer {SUPABASE_KEY}"
         }
-        r = requests.get(url, headers=headers)
+        r = get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT)
 
         if r.status_code == 200 and r.json():
             user = r.json()[0]
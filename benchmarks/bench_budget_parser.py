@@ -0,0 +1,117 @@
+"""Benchmark: budget PDF parsing per extraction backend and worker count.
+
+    python -m benchmarks.bench_budget_parser --pages 120 --lots 360 --lines 12
+    python -m benchmarks.bench_budget_parser --backends pymupdf --workers 1 2 4 --check
+
+Generates a synthetic budget (benchmarks.budget_pdf_fixtures), parses it with
+a layout profile (``standard`` by default) once per (backend, workers) combination and prints
+pages/sec, lines/sec, peak RSS and accuracy against the known ground truth.
+Each run happens in a fresh process so peak RSS is not inherited from the
+previous one.  ``--check`` exits non-zero unless every run is exact.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import budget_parser
+from benchmarks.budget_pdf_fixtures import make_budget_pdf
+from pdf_text_backends import BACKENDS
+
+
+def _peak_rss_mb() -> float:
+    """Peak RSS of this process or its largest finished child (the page workers)."""
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _timed_parse(path, profile, backend, workers):
+    # Parallelise even short fixtures, so worker counts are really compared
+    budget_parser.PARALLEL_MIN_PAGES = 1
+    started = time.perf_counter()
+    rows = budget_parser.parse_rows(path, profile, workers=workers, backend=backend)
+    seconds = time.perf_counter() - started
+    return seconds, rows, _peak_rss_mb()
+
+
+def accuracy(rows, truth: pd.DataFrame) -> dict:
+    """Recall / precision of parsed rows against the ground truth, as multisets."""
+    expected = [tuple(r) for r in truth.itertuples(index=False)]
+    got = [tuple(r) for r in rows]
+    matched = sum((Counter(got) & Counter(expected)).values())
+    return {
+        "recall":    matched / len(expected) if expected else 1.0,
+        "precision": matched / len(got) if got else 1.0,
+        "exact":     got == expected,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--pages", type=int, default=60)
+    ap.add_argument("--lots", type=int, default=180)
+    ap.add_argument("--lines", type=int, default=12, help="item lines per lot")
+    ap.add_argument("--jobs", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-noise", action="store_true", help="omit headers, footers and 'L' subtotal lines")
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    ap.add_argument("--profile", default="standard", choices=list(budget_parser.PROFILES))
+    ap.add_argument("--workers", nargs="+", type=int, default=[1, 4])
+    ap.add_argument("--save", help="also write the generated PDF here")
+    ap.add_argument("--check", action="store_true", help="exit 1 unless every run is exact")
+    args = ap.parse_args()
+
+    pdf_bytes, truth = make_budget_pdf(
+        pages=args.pages, lots=args.lots, lines_per_lot=args.lines,
+        jobs=args.jobs, noise=not args.no_noise, seed=args.seed,
+    )
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as fh:
+        fh.write(pdf_bytes)
+        path = fh.name
+    if args.save:
+        with open(args.save, "wb") as fh:
+            fh.write(pdf_bytes)
+
+    n_pages = budget_parser.page_count(path)
+    print(f"fixture: {n_pages} pages, {truth[['job_number', 'lot_number']].drop_duplicates().shape[0]} lots, "
+          f"{len(truth)} item lines, {len(pdf_bytes) / 1024:.0f} KiB")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for backend in args.backends:
+            for workers in args.workers:
+                # Fresh (non-daemon) process per run → clean peak RSS, and it
+                # may start its own page workers
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    seconds, rows, peak_mb = pool.submit(_timed_parse, path, args.profile, backend, workers).result()
+                results.append({
+                    "backend":   backend,
+                    "workers":   workers,
+                    "seconds":   round(seconds, 3),
+                    "pages/s":   round(n_pages / seconds, 1),
+                    "lines/s":   round(len(truth) / seconds, 0),
+                    "peak_rss_mb": round(peak_mb, 1),
+                    **accuracy(rows, truth),
+                })
+    finally:
+        os.unlink(path)
+
+    report = pd.DataFrame(results)
+    print(report.to_string(index=False))
+    if args.check and not report["exact"].all():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
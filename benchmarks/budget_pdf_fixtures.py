@@ -0,0 +1,105 @@
+"""Synthetic builder budget PDFs with known ground truth.
+
+    from benchmarks.budget_pdf_fixtures import make_budget_pdf
+    pdf_bytes, truth = make_budget_pdf(pages=40, lots=120, lines_per_lot=15)
+
+Pages look like the budgets Budget Upload receives: a job header per job,
+a lot header per lot, item lines in every UOM (some with a trailing cost
+column), plus noise the parser must ignore — column headers, page footers
+and lot/labor subtotal lines starting with "L".  ``truth`` holds the rows
+the parser should return, typed like ``budget_parser.parse_budget`` output.
+"""
+import random
+
+import pandas as pd
+from fpdf import FPDF
+
+from budget_parser import BUDGET_COLUMNS, BUDGET_DTYPES
+
+UOMS        = ["EA", "SQ", "LF", "ROLL", "BNDL", "BUND", "PC", "BOX"]
+COMMUNITIES = ["SUNSET RIDGE", "MESA VERDE PH 2", "CANYON TRAILS", "OAK HOLLOW", "DESERT BLOOM"]
+ELEVATIONS  = ["A", "B", "C", "ELV", "SPN"]
+CODE_HEADS  = ["R", "S", "T", "NC", "DR", "HIP", "VNT", "FLS", "UND", "RDG"]
+CODE_TAILS  = ["", "A", "-12", "#3", "(2)", "+", "/4", "'B"]
+DESC_WORDS  = ["Shingle", "Underlayment", "Drip edge", "Ridge cap", "Vent", "Flashing",
+               "Nails coil", "Starter strip", "Ice shield", "Pipe boot", "Tile", "Batten"]
+NOISE_L     = ["Lot total", "Labor", "Lumber allowance", "Lift charge"]
+
+LINE_H = 4.5
+
+
+class _BudgetPDF(FPDF):
+    footer_noise = True
+
+    def footer(self):
+        if self.footer_noise:
+            self.set_y(-10)
+            self.cell(0, LINE_H, f"Page {self.page_no()} of {{nb}}")
+
+
+def _item_code(rnd):
+    # Never starts with "L": the parser treats those lines as subtotals
+    return f"{rnd.choice(CODE_HEADS)}{rnd.randint(1, 999):03d}{rnd.choice(CODE_TAILS)}"
+
+
+def _qty(rnd):
+    return f"{rnd.randint(1, 400)}" if rnd.random() < 0.3 else f"{rnd.uniform(0.25, 400):.2f}"
+
+
+def make_budget_pdf(pages=10, lots=30, lines_per_lot=12, jobs=2, noise=True, seed=0):
+    """Return ``(pdf_bytes, truth_df)`` for a budget of ``lots`` lots over ``jobs`` jobs.
+
+    Lots are spread evenly over at least ``pages`` pages; a page that fills
+    up breaks onto the next, so long lots can make the PDF longer.
+    """
+    rnd = random.Random(seed)
+    pdf = _BudgetPDF(unit="mm", format="Letter")
+    pdf.footer_noise = noise
+    pdf.alias_nb_pages()
+    pdf.set_auto_page_break(True, margin=12)
+    pdf.set_font("Courier", size=8)
+
+    job_numbers = [f"{rnd.randint(10000, 99999)}-{j + 1:03d}" for j in range(max(1, jobs))]
+    communities = [rnd.choice(COMMUNITIES) for _ in job_numbers]
+    lots_per_job = -(-lots // len(job_numbers))
+
+    def line(text):
+        pdf.cell(0, LINE_H, text, ln=1)
+
+    def new_page():
+        pdf.add_page()
+        if noise:
+            line("Cost Code   Description                      Units Budget  UOM   Cost")
+
+    truth, lot_no = [], 0
+    page_of_lot = [min(pages - 1, i * pages // max(1, lots)) for i in range(lots)] if pages > 0 else [0] * lots
+    current_page = -1
+    for i in range(lots):
+        while current_page < page_of_lot[i]:
+            new_page()
+            current_page += 1
+        job_idx = i // lots_per_job
+        job, community = job_numbers[job_idx], communities[job_idx]
+        if i % lots_per_job == 0:
+            line(f"{job} {community}")
+
+        lot_no += rnd.randint(1, 3)
+        lot = f"{lot_no:04d}" + ("A" if rnd.random() < 0.1 else "")
+        line(f"{lot} {rnd.randint(1, 4)} PLAN {rnd.randint(1500, 3200)} ({rnd.choice(ELEVATIONS)})")
+
+        for k in range(lines_per_lot):
+            code, qty, uom = _item_code(rnd), _qty(rnd), UOMS[(i + k) % len(UOMS)]
+            desc = f"{rnd.choice(DESC_WORDS)} {rnd.choice(DESC_WORDS).lower()}"
+            cost = f"  {rnd.uniform(5, 5000):.2f}" if rnd.random() < 0.3 else ""
+            line(f"  {code:<10} {desc:<32} {qty:>8}  {uom}{cost}")
+            truth.append((community, job, lot, code.upper(), desc, float(qty), uom))
+        if noise:
+            line(f"{rnd.choice(NOISE_L)}  {rnd.uniform(10, 900):.2f} {rnd.choice(UOMS)}")
+
+    while current_page < pages - 1:
+        new_page()
+        current_page += 1
+
+    data = pdf.output(dest="S")
+    data = data.encode("latin-1") if isinstance(data, str) else bytes(data)
+    return data, pd.DataFrame(truth, columns=BUDGET_COLUMNS).astype(BUDGET_DTYPES)
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────────
+# Parsed-budget cache  (SHA-256 of PDF bytes → parsed DataFrame)
+# ──────────────────────────────────────────────────────────────────────────
+CACHE_MAX_ENTRIES = int(os.getenv("BUDGET_CACHE_MAX_ENTRIES", "16"))
+CACHE_MAX_MB      = float(os.getenv("BUDGET_CACHE_MAX_MB", "256"))
+CACHE_SPILL_DIR   = os.getenv("BUDGET_CACHE_DIR")  # optional Parquet spill
+
+
+def content_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest used as the cache key for an upload."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParsedBudgetCache:
+    """Process-wide LRU of parsed budgets, bounded by entry count and memory."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_mb=CACHE_MAX_MB, spill_dir=CACHE_SPILL_DIR):
+        self.max_entries = max_entries
+        self.max_bytes   = int(max_mb * 1024 * 1024)
+        self.spill_dir   = spill_dir
+        self._entries    = OrderedDict()   # key → (DataFrame, nbytes)
+        self._lock       = threading.Lock()
+        self._inflight   = {}              # key → Lock, so one parse per PDF
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    # --- internals ---------------------------------------------------------
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.parquet")
+
+    def _remember(self, key, df):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._entries[key] = (df, nbytes)
+            self._entries.move_to_end(key)
+            total = sum(n for _, n in self._entries.values())
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or total > self.max_bytes
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                total -= evicted
+
+    # --- public API --------------------------------------------------------
+    def get(self, key):
+        """Return a copy of the cached DataFrame, or None on a miss."""
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                return hit[0].copy()
+
+        if self.spill_dir and os.path.exists(self._spill_path(key)):
+            try:
+                df = pd.read_parquet(self._spill_path(key))
+            except Exception:
+                return None
+            self._remember(key, df)
+            return df.copy()
+        return None
+
+    def put(self, key, df):
+        self._remember(key, df.copy())
+        if self.spill_dir:
+            try:
+                df.to_parquet(self._spill_path(key), index=False)
+            except Exception:
+                pass  # spill is best-effort; memory copy is still valid
+
+    @staticmethod
+    def _key(upload_hash, variant):
+        return f"{upload_hash}.{variant}" if variant else upload_hash
+
+    def lookup(self, pdf_bytes: bytes, variant: str | None = None):
+        """Return ``(upload_hash, df)`` with ``df`` None on a miss (no parsing)."""
+        upload_hash = content_hash(pdf_bytes)
+        return upload_hash, self.get(self._key(upload_hash, variant))
+
+    def store(self, upload_hash: str, df, variant: str | None = None):
+        self.put(self._key(upload_hash, variant), df)
+
+    @contextmanager
+    def claim(self, pdf_bytes: bytes, variant: str | None = None):
+        """Hold the PDF's in-flight lock; yields ``(upload_hash, df)``.
+
+        ``df`` is None on a miss: the caller parses and calls ``store``
+        before leaving the block, and sessions waiting on the same PDF then
+        get the stored frame instead of parsing it again.
+        """
+        upload_hash = content_hash(pdf_bytes)
+        key = self._key(upload_hash, variant)
+        df = self.get(key)
+        if df is not None:
+            yield upload_hash, df
+            return
+
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                yield upload_hash, self.get(key)  # another session may have finished meanwhile
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get_or_parse(self, pdf_bytes: bytes, parser, variant: str | None = None):
+        """Return ``(upload_hash, df)``, running ``parser`` once per unique PDF.
+
+        ``variant`` (e.g. the extraction backend) keeps differently parsed
+        copies of the same upload apart without changing the upload hash.
+        """
+        with self.claim(pdf_bytes, variant) as (upload_hash, df):
+            if df is None:
+                df = parser(io.BytesIO(pdf_bytes))
+                self.store(upload_hash, df, variant)
+        return upload_hash, df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = ParsedBudgetCache()
+
+
+def get_or_parse(pdf_bytes: bytes, parser, variant: str | None = None):
+    """Module-level shortcut onto the shared process-wide cache."""
+    return _cache.get_or_parse(pdf_bytes, parser, variant)
+
+
+def claim(pdf_bytes: bytes, variant: str | None = None):
+    return _cache.claim(pdf_bytes, variant)
+
+
+def lookup(pdf_bytes: bytes, variant: str | None = None):
+    return _cache.lookup(pdf_bytes, variant)
+
+
+def store(upload_hash: str, df, variant: str | None = None):
+    _cache.store(upload_hash, df, variant)
+
+
+def clear():
+    _cache.clear()
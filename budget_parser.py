@@ -0,0 +1,341 @@
+import difflib
+import math
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import pandas as pd
+
+from pdf_text_backends import get_backend
+
+# ──────────────────────────────────────────────────────────────────────────
+# Page-level budget parsing engine
+#
+# A *layout profile* names the precompiled patterns for one builder's budget
+# format.  Every page is reduced to a list of line *events* (job header, lot header,
+# item line).  Classifying pages is independent work, so page ranges can be
+# farmed out to a process pool; the reducer then replays the events in page
+# order and carries the "current job / community / last lot" state across
+# range boundaries, giving the same rows as a single serial pass.
+# ──────────────────────────────────────────────────────────────────────────
+PARSE_WORKERS      = int(os.getenv("BUDGET_PARSE_WORKERS", "1"))
+PARALLEL_MIN_PAGES = int(os.getenv("BUDGET_PARSE_MIN_PAGES", "40"))
+BATCH_WORKERS      = int(os.getenv("BUDGET_BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+DEFAULT_PROFILE    = os.getenv("BUDGET_LAYOUT_PROFILE", "standard").lower()
+TRACE              = os.getenv("BUDGET_PARSE_TRACE", "").lower() in ("1", "true", "yes")
+
+JOB, LOT, ITEM = "J", "L", "I"
+
+BUDGET_COLUMNS = [
+    "community", "job_number", "lot_number", "cost_code",
+    "description", "units_budget", "uom",
+]
+# Low-cardinality text is stored as categoricals; job / lot stay plain
+# strings because they are merged against Supabase tables downstream.
+BUDGET_DTYPES = {
+    "community":    "category",
+    "job_number":   "str",
+    "lot_number":   "str",
+    "cost_code":    "category",
+    "description":  "str",
+    "units_budget": "float64",
+    "uom":          "category",
+}
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# Layout profiles  (one per builder budget format)
+# ──────────────────────────────────────────────────────────────────────────
+class LayoutProfile(NamedTuple):
+    name: str
+    lot_re: re.Pattern
+    item_re: re.Pattern
+    job_re: re.Pattern = re.compile(r"^(\d{5}-\d{3})\s")
+    skip_prefix: str = "L"  # subtotal / labor lines that look like items
+    description: str = ""
+
+
+PROFILES = {
+    "standard": LayoutProfile(
+        name="standard",
+        lot_re=re.compile(r"""^\s*(?P<lot>\d{1,4}[A-Z]?)\s+\d+\s+.+?\(\w+\)"""),
+        item_re=re.compile(
+            r"""^\s*([A-Za-z0-9()+\"'#/\-]{2,})\s+(.+?)\s+([\d.]+)\s+"""
+            r"""(EA|SQ|LF|ROLL|BNDL|BUND|PC|BOX)(?:\s+.+)?$"""
+        ),
+        description="Budget Upload: 1-4 digit lots with optional suffix (12A), all UOMs, trailing columns allowed",
+    ),
+    "legacy": LayoutProfile(
+        name="legacy",
+        lot_re=re.compile(r"^(\d{4})\s+[\d\s\w]+?\(\w+\)"),
+        item_re=re.compile(
+            r"^\s*([A-Za-z0-9\(\)\+\"'#\/\-]{2,})\s+(.+?)\s+([\d.]+)\s+(EA|SQ|BNDL|ROLL|PC|BUND|BOX)\s*$"
+        ),
+        description="pdf_budget_parser_final: exactly 4-digit lots, no LF, nothing after the UOM",
+    ),
+}
+
+
+def get_profile(profile=None) -> LayoutProfile:
+    """Return a profile by name (default ``BUDGET_LAYOUT_PROFILE``), or pass one through."""
+    if isinstance(profile, LayoutProfile):
+        return profile
+    key = (profile or DEFAULT_PROFILE).strip().lower()
+    if key not in PROFILES:
+        raise ValueError(f"Unknown layout profile {profile!r}; choose from {sorted(PROFILES)}")
+    return PROFILES[key]
+
+
+class BudgetLine(NamedTuple):
+    """One parsed budget item line, tagged with the page it came from."""
+    page: int
+    community: str | None
+    job_number: str | None
+    lot_number: str
+    cost_code: str
+    description: str
+    units_budget: float
+    uom: str
+
+
+def _as_source(pdf):
+    """Return a picklable source (path or bytes) for a path, bytes or file-like."""
+    if isinstance(pdf, (str, os.PathLike)):
+        return os.fspath(pdf)
+    if isinstance(pdf, (bytes, bytearray)):
+        return bytes(pdf)
+    if hasattr(pdf, "getvalue"):
+        return pdf.getvalue()
+    pdf.seek(0)
+    return pdf.read()
+
+
+def page_count(source, backend: str | None = None) -> int:
+    return get_backend(backend).page_count(source)
+
+
+def page_ranges(n_pages: int, n_chunks: int) -> list[tuple[int, int]]:
+    """Split ``range(n_pages)`` into at most ``n_chunks`` contiguous ranges."""
+    size = max(1, math.ceil(n_pages / max(1, n_chunks)))
+    return [(start, min(start + size, n_pages)) for start in range(0, n_pages, size)]
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# Line classification  (runs inside workers)
+# ──────────────────────────────────────────────────────────────────────────
+def classify_line(line: str, profile: LayoutProfile) -> list[tuple]:
+    events = []
+    stripped = line.strip()
+
+    job_match = profile.job_re.match(stripped)
+    if job_match:
+        job_number = job_match.group(1)
+        events.append((JOB, job_number, stripped.split(job_number)[-1].strip()))
+
+    lot_match = profile.lot_re.match(line)
+    if lot_match:
+        events.append((LOT, lot_match.group(1)))
+
+    if profile.skip_prefix and stripped.startswith(profile.skip_prefix):
+        return events
+
+    item_match = profile.item_re.match(line)
+    if item_match:
+        code, desc, qty, uom = item_match.groups()[:4]
+        events.append((ITEM, code.strip().upper(), desc.strip(), qty, uom))
+    return events
+
+
+def classify_text(text, profile: LayoutProfile):
+    """Return the events for one page, or None when the page has no text."""
+    if not text:
+        return None
+    events = []
+    for line in text.splitlines():
+        events.extend(classify_line(line, profile))
+    return events
+
+
+def _classify_range(source, start, stop, profile, backend=None):
+    return [
+        classify_text(text, profile)
+        for _, text in get_backend(backend).iter_page_texts(source, start, stop)
+    ]
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# Driver + reducer
+# ──────────────────────────────────────────────────────────────────────────
+def iter_page_events(pdf, profile=None, workers: int | None = None, backend: str | None = None):
+    """Yield ``(page_number, events)`` in page order, in parallel when worthwhile."""
+    profile = get_profile(profile)
+    source = _as_source(pdf)
+    backend = get_backend(backend).name
+    workers = PARSE_WORKERS if workers is None else workers
+    n_pages = page_count(source, backend)
+
+    if workers <= 1 or n_pages < PARALLEL_MIN_PAGES:
+        for page_number, text in get_backend(backend).iter_page_texts(source):
+            yield page_number, classify_text(text, profile)
+        return
+
+    ranges = page_ranges(n_pages, workers)
+    ctx = multiprocessing.get_context("spawn")  # never fork the threaded server
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=ctx) as pool:
+        results = pool.map(
+            _classify_range,
+            [source] * len(ranges),
+            [start for start, _ in ranges],
+            [stop for _, stop in ranges],
+            [profile] * len(ranges),
+            [backend] * len(ranges),
+        )
+        for (start, _), pages in zip(ranges, results):
+            for offset, events in enumerate(pages):
+                yield start + offset + 1, events
+
+
+def reduce_events(events, state=(None, None, None)):
+    """Replay events into row tuples; return ``(rows, state)`` for the next call.
+
+    Rows are ``(community, job_number, lot_number, cost_code, description,
+    units_budget, uom)``.
+    """
+    job_number, community, last_lot = state
+    rows = []
+    for event in events:
+        kind = event[0]
+        if kind == JOB:
+            _, job_number, community = event
+        elif kind == LOT:
+            last_lot = event[1]
+        elif last_lot:
+            _, code, desc, qty, uom = event
+            rows.append((community, job_number, last_lot, code, desc, float(qty), uom))
+    return rows, (job_number, community, last_lot)
+
+
+def iter_budget_pages(pdf, profile=None, workers: int | None = None, backend: str | None = None, trace=None):
+    """Yield ``(page_number, [BudgetLine, ...])`` as each page is read.
+
+    Pages without item lines still yield an empty list so callers can drive
+    a page-based progress bar.  ``trace`` (e.g. ``print``) receives one
+    message per empty page and per parsed row; ``BUDGET_PARSE_TRACE=1``
+    defaults it to ``print``.
+    """
+    if trace is None and TRACE:
+        trace = print
+    state = (None, None, None)
+    for page_number, events in iter_page_events(pdf, profile, workers, backend):
+        page_rows = []
+        if events:
+            page_rows, state = reduce_events(events, state)
+        elif trace and events is None:
+            trace(f"[TRACE] No text found on page {page_number}")
+        if trace:
+            for community, job, lot, code, desc, qty, uom in page_rows:
+                trace(f"[TRACE] p{page_number}: job={job}, lot={lot}, code={code}, desc={desc}, qty={qty}, uom={uom}")
+        yield page_number, [BudgetLine(page_number, *row) for row in page_rows]
+
+
+def iter_budget_lines(pdf, profile=None, workers: int | None = None, backend: str | None = None, trace=None):
+    """Yield typed :class:`BudgetLine` records page by page."""
+    for _, lines in iter_budget_pages(pdf, profile, workers, backend, trace):
+        yield from lines
+
+
+def parse_rows(pdf, profile=None, workers: int | None = None, backend: str | None = None) -> list[tuple]:
+    return [line[1:] for line in iter_budget_lines(pdf, profile, workers, backend)]
+
+
+def lines_to_frame(lines) -> pd.DataFrame:
+    """Build the typed budget frame (``BUDGET_COLUMNS`` / ``BUDGET_DTYPES``) from BudgetLines."""
+    columns = list(zip(*(line[1:] for line in lines))) or [()] * len(BUDGET_COLUMNS)
+    return pd.DataFrame(
+        {name: pd.Series(values, dtype=BUDGET_DTYPES[name]) for name, values in zip(BUDGET_COLUMNS, columns)}
+    )
+
+
+def parse_budget(pdf, profile=None, workers: int | None = None, backend: str | None = None, trace=None) -> pd.DataFrame:
+    """Parse a whole budget PDF into the typed budget frame."""
+    return lines_to_frame(iter_budget_lines(pdf, profile, workers, backend, trace))
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# Batch parsing  (one file per worker)
+# ──────────────────────────────────────────────────────────────────────────
+def _parse_file(source, profile, backend=None):
+    started = time.perf_counter()
+    try:
+        frame, error = parse_budget(source, profile, workers=1, backend=backend), None
+    except Exception as e:  # a corrupt PDF must not sink the rest of the batch
+        frame, error = None, f"{type(e).__name__}: {e}"
+    return frame, time.perf_counter() - started, error
+
+
+def parse_many(sources: dict, profile=None, workers: int | None = None, backend: str | None = None):
+    """Parse several PDFs concurrently, yielding ``(name, frame, seconds, error)`` as each finishes.
+
+    ``sources`` maps a name to a path or bytes.  Each file is parsed serially
+    inside its own worker, so pools are never nested.  A file that fails to
+    parse yields ``frame=None`` and the reason in ``error``; the rest go on.
+    """
+    profile = get_profile(profile)
+    backend = get_backend(backend).name
+    workers = BATCH_WORKERS if workers is None else workers
+    sources = {name: _as_source(pdf) for name, pdf in sources.items()}
+
+    if workers <= 1 or len(sources) <= 1:
+        for name, source in sources.items():
+            yield (name, *_parse_file(source, profile, backend))
+        return
+
+    ctx = multiprocessing.get_context("spawn")  # never fork the threaded server
+    with ProcessPoolExecutor(max_workers=min(workers, len(sources)), mp_context=ctx) as pool:
+        futures = {
+            pool.submit(_parse_file, source, profile, backend): name
+            for name, source in sources.items()
+        }
+        for fut in as_completed(futures):
+            try:
+                yield (futures[fut], *fut.result())
+            except Exception as e:  # e.g. the worker process died
+                yield (futures[fut], None, None, f"{type(e).__name__}: {e}")
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# Backend parity check
+# ──────────────────────────────────────────────────────────────────────────
+def compare_backends(pdf, profile=None, backends=("pdfplumber", "pymupdf")) -> pd.DataFrame:
+    """Return one row per matched line that only one of the two backends produced.
+
+    An empty frame means both backends feed identical job/lot/item lines to
+    the matcher, so switching backends cannot change the parsed budget.
+    """
+    profile = get_profile(profile)
+    source = _as_source(pdf)
+    left, right = (get_backend(name) for name in backends)
+    left_pages  = [classify_text(t, profile) or [] for _, t in left.iter_page_texts(source)]
+    right_pages = [classify_text(t, profile) or [] for _, t in right.iter_page_texts(source)]
+
+    diffs = []
+    for page_idx in range(max(len(left_pages), len(right_pages))):
+        a = left_pages[page_idx] if page_idx < len(left_pages) else []
+        b = right_pages[page_idx] if page_idx < len(right_pages) else []
+        if a == b:
+            continue
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(a=a, b=b, autojunk=False).get_opcodes():
+            if tag == "equal":
+                continue
+            for backend, events in ((left.name, a[i1:i2]), (right.name, b[j1:j2])):
+                for event in events:
+                    diffs.append({
+                        "page": page_idx + 1,
+                        "only_in": backend,
+                        "kind": {JOB: "job", LOT: "lot", ITEM: "item"}[event[0]],
+                        "line": " | ".join(str(v) for v in event[1:]),
+                    })
+    return pd.DataFrame(diffs, columns=["page", "only_in", "kind", "line"])
@@ -0,0 +1,108 @@
+import contextvars
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────────
+# Chunked, idempotent bulk writes to Supabase
+# ──────────────────────────────────────────────────────────────────────────
+CHUNK_SIZE  = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "3"))
+MAX_RETRIES = int(os.getenv("BULK_MAX_RETRIES", "4"))
+BACKOFF_S   = float(os.getenv("BULK_BACKOFF_S", "0.5"))
+
+# Fixed namespace so the same upload always maps to the same pulltag uids
+PULLTAG_UID_NAMESPACE = uuid.UUID("5b0f7d3e-4c1a-4f43-9d0e-7a61c2b8e915")
+PULLTAG_KEY = ["job_number", "lot_number", "cost_code", "item_code"]
+
+
+def deterministic_uids(df: pd.DataFrame, upload_hash: str, key_cols=PULLTAG_KEY) -> pd.Series:
+    """Return a uuid5 per row from (job, lot, cost code, item code, upload hash).
+
+    Rows sharing the whole key (e.g. a cost code listed twice in one lot) get
+    an occurrence number so they stay distinct but still reproducible.
+    """
+    occurrence = df.groupby(list(key_cols), sort=False, dropna=False).cumcount()
+    keys = df[list(key_cols)].astype(str).agg("|".join, axis=1)
+    return pd.Series(
+        [str(uuid.uuid5(PULLTAG_UID_NAMESPACE, f"{k}|{upload_hash}|{n}")) for k, n in zip(keys, occurrence)],
+        index=df.index,
+    )
+
+
+def chunked(records: list, size: int):
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+def _write_chunk(client, table, chunk, on_conflict, retries):
+    for attempt in range(retries + 1):
+        try:
+            res = (
+                client.table(table)
+                .upsert(chunk, on_conflict=on_conflict, ignore_duplicates=True)
+                .execute()
+            )
+            return len(res.data or [])
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(BACKOFF_S * (2 ** attempt) * (1 + random.random()))
+
+
+def bulk_upsert(
+    client,
+    table: str,
+    records: list[dict],
+    on_conflict: str = "uid",
+    chunk_size: int = CHUNK_SIZE,
+    concurrency: int = CONCURRENCY,
+    retries: int = MAX_RETRIES,
+    progress=None,
+):
+    """Write ``records`` in chunks, a few at a time, retrying with backoff.
+
+    Existing ``on_conflict`` keys are skipped (ON CONFLICT DO NOTHING), so a
+    re-submit never duplicates rows nor resets rows already moved on.
+    ``progress(done, total)`` is called from the calling thread after each
+    chunk.  Returns ``(inserted, errors)`` where ``errors`` lists the chunks
+    that still failed after every retry.
+    """
+    chunks = list(chunked(records, max(1, chunk_size)))
+    inserted, done, errors = 0, 0, []
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            # copy_context so per-rerun request counters see the pool's writes
+            pool.submit(contextvars.copy_context().run, _write_chunk, client, table, chunk, on_conflict, retries): (i, chunk)
+            for i, chunk in enumerate(chunks)
+        }
+        for fut in as_completed(futures):
+            i, chunk = futures[fut]
+            try:
+                inserted += fut.result()
+            except Exception as e:
+                errors.append({"chunk": i, "rows": len(chunk), "error": str(e)})
+            done += len(chunk)
+            if progress:
+                progress(done, len(records))
+    return inserted, errors
+
+
+def fetch_all(build_query, page_size: int = 1000) -> list[dict]:
+    """Page through a PostgREST select with ``.range()`` past the row cap.
+
+    ``build_query`` returns a fresh, ordered select each call; builders are
+    mutable, so one cannot be re-ranged.
+    """
+    rows, start = [], 0
+    while True:
+        page = build_query().range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
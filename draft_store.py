@@ -0,0 +1,280 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from bulk_writer import fetch_all
+
+# ──────────────────────────────────────────────────────────────────────────
+# Draft stores behind field_tracker
+#
+# DRAFT_BACKEND picks where tracked-field drafts live:
+#   "supabase" – the drafts table, written behind the rerun in batches
+#   "sqlite"   – a local SQLite journal on the app server; a sync thread
+#                pushes edits to the drafts table and pulls remote ones, so
+#                saves and reads never wait on (or fail with) the network
+# Both expose load(username, tab) → {key: value}, put(...), flush(...) and
+# flush_soon(...), which only wakes the background thread (safe from finalizers).
+# ──────────────────────────────────────────────────────────────────────────
+DRAFT_BACKEND     = os.getenv("DRAFT_BACKEND", "supabase").lower()
+DRAFT_FLUSH_S     = float(os.getenv("DRAFT_FLUSH_S", "2"))
+DRAFT_MAX_DELAY_S = float(os.getenv("DRAFT_MAX_DELAY_S", "10"))
+DRAFT_DB_PATH     = os.getenv("DRAFT_DB_PATH", "data/drafts.sqlite3")
+DRAFT_SYNC_S      = float(os.getenv("DRAFT_SYNC_S", "5"))
+DRAFT_SYNC_BATCH  = int(os.getenv("DRAFT_SYNC_BATCH", "500"))
+
+log = logging.getLogger(__name__)
+
+
+def _upsert(supabase, drafts: dict):
+    rows = [
+        {"username": u, "tab": t, "key": k, "value": v}
+        for (u, t, k), v in drafts.items()
+    ]
+    supabase.table("drafts").upsert(rows).execute()
+
+
+def _fetch(supabase, username, tab) -> dict:
+    response = supabase.table("drafts").select("key, value")\
+        .eq("username", username).eq("tab", tab).execute()
+    return {row["key"]: row["value"] for row in response.data or []}
+
+
+# === SUPABASE: write-behind buffer ===
+class SupabaseDraftStore:
+    """Edits coalesce per key and go out as one multi-row upsert once they
+    have been quiet for DRAFT_FLUSH_S (or waited DRAFT_MAX_DELAY_S)."""
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._pending = {}        # (username, tab, key) → value, latest edit wins
+        self._first_at = None     # when the oldest pending edit arrived
+        self._last_at = None      # when the newest one did
+        self._due_now = False     # flush_soon() asked for a flush without waiting
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # keeps flushes in edit order
+        self._thread = threading.Thread(target=self._run, name="draft-writer", daemon=True)
+        self._thread.start()
+
+    def load(self, username, tab) -> dict:
+        drafts = _fetch(self.supabase, username, tab)
+        with self._cond:  # edits not written yet still win
+            drafts.update({k: v for (u, t, k), v in self._pending.items() if (u, t) == (username, tab)})
+        return drafts
+
+    def put(self, username, tab, key, value):
+        with self._cond:
+            now = time.monotonic()
+            self._pending[(username, tab, key)] = value
+            self._first_at = self._first_at or now
+            self._last_at = now
+            self._cond.notify()
+
+    def flush(self, username=None, tab=None):
+        """Write pending drafts now (all, or one user's / one tab's)."""
+        with self._write_lock:
+            with self._cond:
+                picked = {
+                    k: v for k, v in self._pending.items()
+                    if (username is None or k[0] == username) and (tab is None or k[1] == tab)
+                }
+                for k in picked:
+                    del self._pending[k]
+                if not self._pending:
+                    self._first_at = self._last_at = None
+            self._write(picked)
+
+    def flush_soon(self, username=None):
+        """Have the writer thread flush now; never blocks on the network."""
+        with self._cond:
+            if any(username is None or k[0] == username for k in self._pending):
+                self._due_now = True
+                self._cond.notify()
+
+    def _write(self, drafts):
+        if not drafts:
+            return
+        try:
+            _upsert(self.supabase, drafts)
+        except Exception as e:
+            log.warning("Draft flush of %d rows failed, will retry: %s", len(drafts), e)
+            with self._cond:
+                for k, v in drafts.items():
+                    self._pending.setdefault(k, v)  # keep any newer edit
+                now = time.monotonic()
+                self._first_at = self._first_at or now
+                self._last_at = now
+
+    def _due_in(self):
+        if not self._pending:
+            return None
+        if self._due_now:
+            return 0.0
+        now = time.monotonic()
+        return max(0.0, min(self._last_at + DRAFT_FLUSH_S, self._first_at + DRAFT_MAX_DELAY_S) - now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while (wait := self._due_in()) != 0.0:
+                    self._cond.wait(wait)
+                self._due_now = False
+            self.flush()
+
+
+# === SQLITE: local journal + background sync ===
+class SQLiteDraftStore:
+    """Local journal is the source of truth for this server; rows marked dirty
+    are pushed in batches of DRAFT_SYNC_BATCH every DRAFT_SYNC_S, and drafts
+    of the users seen here are pulled back unless a local edit is pending."""
+
+    def __init__(self, supabase, path=DRAFT_DB_PATH):
+        self.supabase = supabase
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS drafts (
+                username   TEXT NOT NULL,
+                tab        TEXT NOT NULL,
+                key        TEXT NOT NULL,
+                value      TEXT,
+                updated_at REAL NOT NULL,
+                dirty      INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (username, tab, key)
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS drafts_dirty_idx ON drafts (dirty) WHERE dirty = 1")
+        self._lock = threading.Lock()
+        self._wanted = set()          # (username, tab) loaded here; the sync thread keeps them fresh
+        self._pulled = set()          # (username, tab) fetched from Supabase at least once
+        self._offline = False         # last pull failed: loads stop waiting on seeds
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="draft-sync", daemon=True)
+        self._thread.start()
+
+    def load(self, username, tab) -> dict:
+        with self._lock:
+            self._wanted.add((username, tab))
+            seed = (username, tab) not in self._pulled and not self._offline
+        if seed:  # fresh disk (e.g. after a deploy); while offline the sync thread seeds
+            self._pull([(username, tab)])
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM drafts WHERE username = ? AND tab = ?", (username, tab)
+            ).fetchall()
+        return dict(rows)
+
+    def put(self, username, tab, key, value):
+        with self._lock:
+            self._db.execute(
+                """INSERT INTO drafts (username, tab, key, value, updated_at, dirty)
+                   VALUES (?, ?, ?, ?, ?, 1)
+                   ON CONFLICT (username, tab, key)
+                   DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at, dirty = 1""",
+                (username, tab, key, value, time.time()),
+            )
+
+    def flush(self, username=None, tab=None):
+        """Try to push now; anything that fails stays dirty for the sync thread."""
+        self._push(username, tab)
+
+    def flush_soon(self, username=None):
+        """Have the sync thread push now instead of at its next tick."""
+        self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM drafts WHERE dirty = 1").fetchone()[0]
+
+    def _push(self, username=None, tab=None):
+        while True:
+            sql, args = "SELECT username, tab, key, value, updated_at FROM drafts WHERE dirty = 1", []
+            if username is not None:
+                sql, args = sql + " AND username = ?", args + [username]
+            if tab is not None:
+                sql, args = sql + " AND tab = ?", args + [tab]
+            with self._lock:
+                rows = self._db.execute(f"{sql} LIMIT ?", (*args, DRAFT_SYNC_BATCH)).fetchall()
+            if not rows:
+                return
+            try:
+                _upsert(self.supabase, {(u, t, k): v for u, t, k, v, _ in rows})
+            except Exception as e:
+                log.warning("Draft sync of %d rows failed, will retry: %s", len(rows), e)
+                return
+            with self._lock:  # an edit made during the push stays dirty
+                self._db.executemany(
+                    "UPDATE drafts SET dirty = 0 WHERE username = ? AND tab = ? AND key = ? AND updated_at = ?",
+                    [(u, t, k, at) for u, t, k, _, at in rows],
+                )
+            if len(rows) < DRAFT_SYNC_BATCH:
+                return
+
+    def _pull(self, pairs):
+        users_by_tab = {}
+        for username, tab in pairs:
+            users_by_tab.setdefault(tab, set()).add(username)
+        for tab, users in users_by_tab.items():  # one paged select per tab
+            try:
+                found = fetch_all(
+                    lambda: self.supabase.table("drafts").select("username, key, value")
+                    .eq("tab", tab).in_("username", sorted(users))
+                    .order("username").order("key")
+                )
+            except Exception as e:
+                log.warning("Draft pull of %r for %d users failed: %s", tab, len(users), e)
+                with self._lock:
+                    self._offline = True
+                continue
+            now = time.time()
+            with self._lock:
+                self._db.executemany(
+                    """INSERT INTO drafts (username, tab, key, value, updated_at, dirty)
+                       VALUES (?, ?, ?, ?, ?, 0)
+                       ON CONFLICT (username, tab, key)
+                       DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                       WHERE drafts.dirty = 0""",
+                    [(r["username"], tab, r["key"], r["value"], now) for r in found],
+                )
+                self._pulled.update((u, tab) for u in users)
+                self._offline = False
+
+    def _run(self):
+        while True:
+            self._wake.wait(DRAFT_SYNC_S)
+            self._wake.clear()
+            try:
+                self._push()
+                with self._lock:
+                    pairs = list(self._wanted)
+                self._pull(pairs)
+            except Exception as e:  # never let the sync thread die
+                log.warning("Draft sync failed: %s", e)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_draft_store(supabase):
+    """The process-wide store for ``supabase`` (one per client)."""
+    with _stores_lock:
+        store = _stores.get(id(supabase))
+        if store is None:
+            if DRAFT_BACKEND == "sqlite":
+                store = SQLiteDraftStore(supabase)
+            elif DRAFT_BACKEND == "supabase":
+                store = SupabaseDraftStore(supabase)
+            else:
+                raise ValueError(f"Unknown DRAFT_BACKEND {DRAFT_BACKEND!r} (use 'supabase' or 'sqlite')")
+            _stores[id(supabase)] = store
+        return store
+
+
+@atexit.register
+def _flush_all():
+    for store in list(_stores.values()):
+        store.flush()
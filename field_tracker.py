@@ -1,30 +1,70 @@
+import weakref
+
 import streamlit as st
 
+from draft_store import get_draft_store
+
+# Drafts are saved through the store DRAFT_BACKEND selects (see draft_store):
+# edits are written behind the rerun, forms flush on submit, and when a
+# session's state is garbage-collected its pending drafts are handed to the
+# store's background thread (a finalizer must not block on the network).
+
+
+class _SessionDrafts:
+    """Per-session marker; when Streamlit drops the session, its drafts are due."""
+
+
+def _track_session(supabase, username):
+    if "_draft_session" not in st.session_state:
+        marker = st.session_state["_draft_session"] = _SessionDrafts()
+        weakref.finalize(marker, get_draft_store(supabase).flush_soon, username)
+
+
+def flush_drafts(supabase, username=None, tab=None):
+    """Persist buffered drafts now, e.g. when a form is submitted."""
+    get_draft_store(supabase).flush(username, tab)
+
 # === LOAD ===
-def _load_from_supabase(supabase, username, tab, key):
-    response = supabase.table("drafts").select("value")\
-        .eq("username", username).eq("tab", tab).eq("key", key)\
-        .limit(1).execute()
-    return response.data[0]["value"] if response.data else ""
+def preload_drafts(supabase, username, tab) -> dict:
+    """All of (username, tab)'s drafts, fetched once per session in one query."""
+    loaded = st.session_state.setdefault("_drafts", {})
+    if (username, tab) not in loaded:
+        loaded[(username, tab)] = get_draft_store(supabase).load(username, tab)
+    return loaded[(username, tab)]
 
 # === SAVE ===
 def _save_to_supabase(supabase, username, tab, key, value):
-    supabase.table("drafts").upsert({
-        "username": username,
-        "tab": tab,
-        "key": key,
-        "value": value
-    }).execute()
+    _track_session(supabase, username)
+    get_draft_store(supabase).put(username, tab, key, value)
+
+
+def _init_key(supabase, username, tab, key, initial):
+    drafts = preload_drafts(supabase, username, tab)
+    st.session_state[key] = initial(drafts.get(key))
+    # baseline for _changed, so rendering a default isn't saved as an edit
+    drafts[key] = st.session_state[key]
+
+
+def _changed(supabase, username, tab, key, value):
+    # The widget owns st.session_state[key], so compare against the value
+    # last loaded or saved for this key instead.
+    drafts = preload_drafts(supabase, username, tab)
+    if drafts.get(key) == value:
+        return False
+    drafts[key] = value
+    return True
 
 # === TRACKED INPUT ===
 def tracked_input(label, key, username, tab, supabase, default="", **kwargs):
+    if kwargs.get("type") == "password":  # secrets are never drafted or prefilled
+        return st.text_input(label, key=key, **kwargs)
+
     if key not in st.session_state:
-        st.session_state[key] = _load_from_supabase(supabase, username, tab, key) or default
+        _init_key(supabase, username, tab, key, lambda stored: stored or default)
 
     value = st.text_input(label, value=st.session_state[key], key=key, **kwargs)
 
-    if value != st.session_state[key]:
-        st.session_state[key] = value
+    if _changed(supabase, username, tab, key, value):
         _save_to_supabase(supabase, username, tab, key, value)
 
     return value
@@ -32,12 +72,11 @@ def tracked_input(label, key, username, tab, supabase, default="", **kwargs):
 # === TRACKED TEXT AREA ===
 def tracked_text_area(label, key, username, tab, supabase, default="", **kwargs):
     if key not in st.session_state:
-        st.session_state[key] = _load_from_supabase(supabase, username, tab, key) or default
+        _init_key(supabase, username, tab, key, lambda stored: stored or default)
 
     value = st.text_area(label, value=st.session_state[key], key=key, **kwargs)
 
-    if value != st.session_state[key]:
-        st.session_state[key] = value
+    if _changed(supabase, username, tab, key, value):
         _save_to_supabase(supabase, username, tab, key, value)
 
     return value
@@ -45,13 +84,12 @@ def tracked_text_area(label, key, username, tab, supabase, default="", **kwargs)
 # === TRACKED SELECTBOX ===
 def tracked_selectbox(label, options, key, username, tab, supabase, default=None, **kwargs):
     if key not in st.session_state:
-        stored = _load_from_supabase(supabase, username, tab, key)
-        st.session_state[key] = stored if stored in options else default or options[0]
+        _init_key(supabase, username, tab, key,
+                  lambda stored: stored if stored in options else default or options[0])
 
     value = st.selectbox(label, options, index=options.index(st.session_state[key]), key=key, **kwargs)
 
-    if value != st.session_state[key]:
-        st.session_state[key] = value
+    if _changed(supabase, username, tab, key, value):
         _save_to_supabase(supabase, username, tab, key, value)
 
     return value
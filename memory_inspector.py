@@ -0,0 +1,266 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# ──────────────────────────────────────────────────────────────────────────
+# Memory inspector
+#
+# Every rerun records the size of its session's st.session_state entries
+# (DataFrames via memory_usage(deep=True)) in a process-wide registry, so
+# execs can see which sessions / keys hold the memory and free the large
+# entries of sessions nobody has used in a while.  tracemalloc is opt-in: tracing
+# slows every allocation, so it only runs between an exec's Start and Stop.
+# ──────────────────────────────────────────────────────────────────────────
+EVICT_MIN_MB     = float(os.getenv("MEMORY_EVICT_MIN_MB", "5"))
+EVICT_AFTER_MIN  = float(os.getenv("MEMORY_EVICT_AFTER_MIN", "30"))
+TRACE_FRAMES     = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+TOP_N            = int(os.getenv("MEMORY_TOP_N", "15"))
+
+# never evicted: login state and the perf counters
+PROTECTED_KEYS = {
+    "authentication_status", "name", "username", "user", "email", "roles",
+    "logout", "init", "perf_last_rerun",
+}
+# keys that only make sense together; evicting one drops the rest
+RELATED_KEYS = {
+    "loaded_df": ("edited_df", "grid_ready", "download_clicked", "edit_grid"),
+    "edited_df": ("loaded_df", "grid_ready", "download_clicked", "edit_grid"),
+}
+
+_MB = 1024 * 1024
+_MAX_DEPTH = 4
+
+
+def deep_size(value, _depth: int = 0) -> int:
+    """Approximate bytes held by ``value`` (DataFrames counted deeply)."""
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, (bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if hasattr(value, "getbuffer"):  # BytesIO / UploadedFile
+        try:
+            return value.getbuffer().nbytes
+        except (TypeError, ValueError):
+            pass
+    size = sys.getsizeof(value)
+    if _depth >= _MAX_DEPTH:
+        return size
+    if isinstance(value, dict):
+        size += sum(deep_size(k, _depth + 1) + deep_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, _depth + 1) for v in value)
+    return size
+
+
+# --- Per-session registry ------------------------------------------------------
+class _SessionRecord:
+    def __init__(self):
+        self.state = None         # the session's st.session_state, as of its last rerun
+        self.username = None
+        self.tab = None
+        self.last_seen = time.time()
+        self.running = False
+        self.entries = {}         # key → {id, type, bytes, tab}
+
+
+_sessions: dict[str, _SessionRecord] = {}
+_lock = threading.Lock()
+
+
+def _prune():
+    runtime = Runtime.instance() if Runtime.exists() else None
+    with _lock:
+        for sid in list(_sessions):
+            if runtime is None or not runtime.is_active_session(sid):
+                del _sessions[sid]
+
+
+def _snapshot_state(record: _SessionRecord, tab: str | None):
+    entries = {}
+    for key, value in st.session_state.to_dict().items():
+        known = record.entries.get(key)
+        if known and known["id"] == id(value):
+            entries[key] = known  # same object as last rerun: skip re-measuring
+            continue
+        entries[key] = {
+            "id":      id(value),
+            "type":    type(value).__name__,
+            "bytes":   deep_size(value),
+            "tab":     tab,  # tab that was open when the value appeared
+        }
+    record.entries = entries
+
+
+@contextmanager
+def track_session(username: str | None, tab: str | None = None):
+    """Register this session and re-measure its state when the rerun ends."""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        yield
+        return
+
+    # Waits out an evict_stale() in progress, so a tab never runs mid-eviction
+    with _lock:
+        record = _sessions.setdefault(ctx.session_id, _SessionRecord())
+        record.state = ctx.session_state
+        record.running = True
+    try:
+        yield
+    finally:  # st.stop() / st.rerun() end a tab by raising
+        try:
+            _snapshot_state(record, tab)
+        finally:
+            with _lock:
+                record.username, record.tab = username, tab
+                record.last_seen = time.time()
+                record.running = False
+        _prune()
+
+
+def session_summary() -> pd.DataFrame:
+    """One row per live session, largest state first."""
+    now = time.time()
+    with _lock:
+        records = list(_sessions.items())
+    rows = []
+    for sid, rec in records:
+        entries = rec.entries
+        largest = max(entries.items(), key=lambda kv: kv[1]["bytes"], default=(None, None))[0]
+        rows.append({
+            "username":  rec.username,
+            "tab":       rec.tab,
+            "keys":      len(entries),
+            "state_mb":  round(sum(e["bytes"] for e in entries.values()) / _MB, 2),
+            "largest":   largest,
+            "idle_min":  round((now - rec.last_seen) / 60, 1),
+            "session":   sid[:8],
+        })
+    df = pd.DataFrame(rows, columns=["username", "tab", "keys", "state_mb", "largest", "idle_min", "session"])
+    return df.sort_values("state_mb", ascending=False).reset_index(drop=True)
+
+
+def large_entries(min_mb: float = 0.5) -> pd.DataFrame:
+    """Session-state entries of at least ``min_mb``, across every session."""
+    now = time.time()
+    with _lock:
+        records = list(_sessions.items())
+    rows = []
+    for sid, rec in records:
+        idle_min = (now - rec.last_seen) / 60
+        for key, e in rec.entries.items():
+            if e["bytes"] < min_mb * _MB:
+                continue
+            rows.append({
+                "username":  rec.username,
+                "key":       key,
+                "type":      e["type"],
+                "mb":        round(e["bytes"] / _MB, 2),
+                "tab":       e["tab"],
+                "idle_min":  round(idle_min, 1),
+                "stale":     _is_stale(rec, key, e, idle_min),
+                "session":   sid[:8],
+            })
+    df = pd.DataFrame(rows, columns=["username", "key", "type", "mb", "tab", "idle_min", "stale", "session"])
+    return df.sort_values("mb", ascending=False).reset_index(drop=True)
+
+
+def _is_stale(rec: _SessionRecord, key: str, entry: dict, idle_min: float) -> bool:
+    return (
+        not rec.running
+        and key not in PROTECTED_KEYS
+        and entry["bytes"] >= EVICT_MIN_MB * _MB
+        and idle_min >= EVICT_AFTER_MIN
+    )
+
+
+def evict_stale() -> tuple[int, float]:
+    """Free large entries of sessions idle ≥ EVICT_AFTER_MIN → (keys evicted, MB freed).
+
+    Runs under the registry lock, which a session's next rerun takes before
+    its tab starts, so no tab ever sees a half-evicted state.  The session
+    does not need to rerun for the memory to be freed; when it does, an
+    evicted tab just starts over empty (e.g. Sage Export asks for "Load
+    logs" again).
+    """
+    now = time.time()
+    evicted, freed = 0, 0
+    with _lock:
+        for rec in _sessions.values():
+            idle_min = (now - rec.last_seen) / 60
+            stale = [k for k, e in rec.entries.items() if _is_stale(rec, k, e, idle_min)]
+            for key in stale:
+                for k in (key, *RELATED_KEYS.get(key, ())):
+                    entry = rec.entries.pop(k, None)
+                    try:
+                        del rec.state[k]
+                    except KeyError:
+                        continue
+                    evicted += 1
+                    freed += entry["bytes"] if entry else 0
+    return evicted, round(freed / _MB, 2)
+
+
+# --- tracemalloc ---------------------------------------------------------------
+_baseline: list = []  # [Snapshot] once an exec sets one
+
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def is_tracing() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def has_baseline() -> bool:
+    return bool(_baseline)
+
+
+def start_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+
+def stop_tracing():
+    _baseline.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def set_baseline():
+    _baseline[:] = [tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)]
+
+
+def top_allocations(limit: int = TOP_N) -> pd.DataFrame:
+    """Biggest allocation sites now, or the biggest growth since the baseline."""
+    if not tracemalloc.is_tracing():
+        return pd.DataFrame()
+    snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+    if _baseline:
+        stats = snapshot.compare_to(_baseline[0], "lineno")
+        rows = [
+            {"where": str(s.traceback[0]), "kb": round(s.size / 1024, 1),
+             "kb_diff": round(s.size_diff / 1024, 1), "count": s.count, "count_diff": s.count_diff}
+            for s in stats[:limit]
+        ]
+    else:
+        stats = snapshot.statistics("lineno")
+        rows = [
+            {"where": str(s.traceback[0]), "kb": round(s.size / 1024, 1), "count": s.count}
+            for s in stats[:limit]
+        ]
+    return pd.DataFrame(rows)
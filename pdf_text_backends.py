@@ -0,0 +1,93 @@
+import io
+import os
+
+# ──────────────────────────────────────────────────────────────────────────
+# PDF text-extraction backends
+#
+# Each backend turns a source (path or bytes) into one text blob per page,
+# with one budget line per text line.  The budget parser does not care which
+# backend produced the text, so the same LOT/ITEM matcher runs on both.
+# ──────────────────────────────────────────────────────────────────────────
+DEFAULT_BACKEND = os.getenv("BUDGET_PDF_BACKEND", "pdfplumber").lower()
+
+
+class PdfplumberBackend:
+    name = "pdfplumber"
+
+    def _open(self, source):
+        import pdfplumber
+        return pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+    def page_count(self, source) -> int:
+        with self._open(source) as pdf:
+            return len(pdf.pages)
+
+    def iter_page_texts(self, source, start: int = 0, stop: int | None = None):
+        """Yield ``(page_number, text)`` for pages ``start``..``stop`` (0-based, exclusive)."""
+        with self._open(source) as pdf:
+            for page in pdf.pages[start:stop]:
+                text = page.extract_text() or ""
+                # Drop the page's cached chars/objects so memory stays flat
+                # on long budgets instead of growing with every page read.
+                if hasattr(page, "close"):
+                    page.close()
+                else:
+                    page.flush_cache()
+                yield page.page_number, text
+
+
+class PyMuPDFBackend:
+    name = "pymupdf"
+    y_tolerance = 3.0  # same default pdfplumber uses to cluster a text line
+
+    def _open(self, source):
+        try:
+            import pymupdf as fitz
+        except ImportError:  # PyMuPDF < 1.24 only ships the fitz name
+            import fitz
+        if isinstance(source, bytes):
+            return fitz.open(stream=source, filetype="pdf")
+        return fitz.open(source)
+
+    def _page_text(self, page) -> str:
+        # Rebuild visual lines from word boxes so table columns land on one
+        # line, the way pdfplumber's extract_text() lays them out.
+        words = sorted(page.get_text("words"), key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+        lines, current, current_mid = [], [], None
+        for w in words:
+            mid = (w[1] + w[3]) / 2
+            if current and abs(mid - current_mid) > self.y_tolerance:
+                lines.append(current)
+                current = []
+            if not current:
+                current_mid = mid
+            current.append(w)
+        if current:
+            lines.append(current)
+        return "\n".join(" ".join(w[4] for w in sorted(line, key=lambda w: w[0])) for line in lines)
+
+    def page_count(self, source) -> int:
+        with self._open(source) as doc:
+            return doc.page_count
+
+    def iter_page_texts(self, source, start: int = 0, stop: int | None = None):
+        with self._open(source) as doc:
+            stop = doc.page_count if stop is None else min(stop, doc.page_count)
+            for idx in range(start, stop):
+                yield idx + 1, self._page_text(doc[idx])
+
+
+BACKENDS = {
+    "pdfplumber": PdfplumberBackend(),
+    "pymupdf":    PyMuPDFBackend(),
+}
+ALIASES = {"fitz": "pymupdf", "mupdf": "pymupdf", "plumber": "pdfplumber"}
+
+
+def get_backend(name: str | None = None):
+    """Return the backend called ``name``, defaulting to ``BUDGET_PDF_BACKEND``."""
+    key = (name or DEFAULT_BACKEND).strip().lower()
+    key = ALIASES.get(key, key)
+    if key not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend {name!r}; choose from {sorted(BACKENDS)}")
+    return BACKENDS[key]
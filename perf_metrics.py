@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+import streamlit as st
+
+# ──────────────────────────────────────────────────────────────────────────
+# Per-rerun tab timing + Supabase call counters
+#
+# Every rerun of the selected tab gets a RerunStats in a ContextVar; the
+# httpx hooks on the shared Supabase client add each request to whatever
+# stats are current.  Finished reruns land in a process-wide ring buffer.
+# ──────────────────────────────────────────────────────────────────────────
+HISTORY_SIZE = int(os.getenv("PERF_HISTORY_SIZE", "500"))
+
+_history = deque(maxlen=HISTORY_SIZE)
+_history_lock = threading.Lock()
+
+
+class RerunStats:
+    def __init__(self, tab: str | None = None):
+        self.tab = tab
+        self.queries = 0
+        self.rows = 0
+        self.bytes = 0
+        self._lock = threading.Lock()  # bulk writes report from pool threads
+
+    def add(self, rows: int, nbytes: int):
+        with self._lock:
+            self.queries += 1
+            self.rows += rows
+            self.bytes += nbytes
+
+
+_current: ContextVar[RerunStats | None] = ContextVar("rerun_stats", default=None)
+
+
+def current() -> RerunStats | None:
+    """Stats of the rerun running in this context, if any."""
+    return _current.get()
+
+
+def rows_from_content_range(value: str | None) -> int:
+    # PostgREST answers selects with e.g. "0-999/*"; "*/0" means no rows
+    if not value:
+        return 0
+    span = value.split("/")[0]
+    if "-" not in span:
+        return 0
+    start, end = span.split("-", 1)
+    try:
+        return int(end) - int(start) + 1
+    except ValueError:
+        return 0
+
+
+def _on_response(response):
+    stats = _current.get()
+    if stats is None:
+        return
+    response.read()
+    nbytes = response.num_bytes_downloaded or len(response.content)
+    stats.add(rows_from_content_range(response.headers.get("content-range")), nbytes)
+
+
+RESPONSE_HOOKS = [_on_response]
+
+
+@contextmanager
+def track_rerun(tab: str, username: str | None = None):
+    """Time one rerun of ``tab`` and count the Supabase requests it makes."""
+    stats = RerunStats(tab)
+    token = _current.set(stats)
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:  # st.stop() / st.rerun() end a tab by raising
+        _current.reset(token)
+        record = {
+            "time":     pd.Timestamp.now(),
+            "tab":      tab,
+            "username": username,
+            "wall_ms":  round((time.perf_counter() - started) * 1000, 1),
+            "queries":  stats.queries,
+            "rows":     stats.rows,
+            "kb":       round(stats.bytes / 1024, 1),
+        }
+        with _history_lock:
+            _history.append(record)
+        st.session_state["perf_last_rerun"] = record
+
+
+def history() -> pd.DataFrame:
+    with _history_lock:
+        rows = list(_history)
+    return pd.DataFrame(rows, columns=["time", "tab", "username", "wall_ms", "queries", "rows", "kb"])
+
+
+def tab_summary(df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """p50 / p95 wall time and mean Supabase traffic per tab."""
+    df = history() if df is None else df
+    if df.empty:
+        return pd.DataFrame(columns=["tab", "reruns", "p50_ms", "p95_ms", "queries", "rows", "kb"])
+    grouped = df.groupby("tab")
+    return pd.DataFrame({
+        "reruns":  grouped.size(),
+        "p50_ms":  grouped["wall_ms"].quantile(0.50).round(1),
+        "p95_ms":  grouped["wall_ms"].quantile(0.95).round(1),
+        "queries": grouped["queries"].mean().round(1),
+        "rows":    grouped["rows"].mean().round(0),
+        "kb":      grouped["kb"].mean().round(1),
+    }).sort_values("p95_ms", ascending=False).reset_index()
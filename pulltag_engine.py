@@ -0,0 +1,360 @@
+import math
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────────
+# Pulltag generation engine
+#
+# Budget lines → lot roof type → community rules → items_master, as a few
+# pandas merges instead of nested iterrows.  Row order matches the original
+# per-lot loop: (job, lot) sorted, then budget line order, then rule order.
+# ──────────────────────────────────────────────────────────────────────────
+NO_ROUND_ITEMS = {"NC134", "NC34"}
+
+PULLTAG_COLUMNS = [
+    "uid", "job_number", "lot_number", "roof_type", "item_code", "cost_code",
+    "description", "quantity", "kitted_qty", "shorted", "backorder_qty",
+    "backorder_status", "status", "uploaded_on", "requested_on", "kitted_on",
+    "resolved_on", "exported_on", "warehouse", "uom", "batch_id",
+    "updated_by", "requested_by",
+]
+
+
+def compute_quantity(units_budget: float, logic, item_code: str | None = None):
+    """Return qty, keeping fractions for NO_ROUND_ITEMS, ceilling for others."""
+    try:
+        if isinstance(logic, str) and "Units Budget" in logic:
+            if "*" in logic:
+                factor = float(logic.split("*")[-1].strip())
+                raw_qty = units_budget * factor
+            elif "/" in logic:
+                divisor = float(logic.split("/")[-1].strip())
+                raw_qty = units_budget / divisor
+            else:
+                raw_qty = units_budget
+        else:
+            raw_qty = float(logic)
+
+        if item_code and item_code.upper() in NO_ROUND_ITEMS:
+            return round(raw_qty, 2)
+        return float(math.ceil(raw_qty))
+    except Exception:
+        return None
+
+
+def normalize_communities(communities_df: pd.DataFrame) -> pd.DataFrame:
+    """Strip / upper-case the join keys the same way Budget Upload always has."""
+    df = communities_df.copy()
+    df["job_number"] = df["job_number"].astype(str).str.strip()
+    df["roof_type"]  = df["roof_type"].astype(str).str.strip()
+    df["cost_code"]  = df["cost_code"].astype(str).str.strip().str.upper()
+    df["item_code"]  = df["item_code"].astype(str).str.strip()
+    return df
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# Compiled quantity logic
+#
+# ``item_code_qty`` is parsed once per rule into an operator and a numeric
+# operand, with the same reading compute_quantity() applies per pulltag:
+#   "Units Budget * 1.1" → mul 1.1     "Units Budget / 3" → div 3
+#   "Units Budget"       → identity    "2"                → const 2
+# ──────────────────────────────────────────────────────────────────────────
+QTY_MUL, QTY_DIV, QTY_IDENTITY, QTY_CONST = "mul", "div", "identity", "const"
+
+
+def compile_quantity_logic(logic) -> tuple[str, float]:
+    """Return ``(op, operand)`` for one rule; raise ValueError if it cannot compile."""
+    try:
+        if isinstance(logic, str) and "Units Budget" in logic:
+            if "*" in logic:
+                op, operand = QTY_MUL, float(logic.split("*")[-1].strip())
+            elif "/" in logic:
+                op, operand = QTY_DIV, float(logic.split("/")[-1].strip())
+            else:
+                op, operand = QTY_IDENTITY, 1.0
+        else:
+            op, operand = QTY_CONST, float(logic)
+    except (TypeError, ValueError):
+        raise ValueError(f"unparseable quantity logic {logic!r}") from None
+
+    if not math.isfinite(operand):
+        raise ValueError(f"non-finite operand in {logic!r}")
+    if op == QTY_DIV and operand == 0:
+        raise ValueError(f"division by zero in {logic!r}")
+    return op, operand
+
+
+def compile_quantity_rules(communities_df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy with ``qty_op``, ``qty_operand`` and ``qty_error`` columns.
+
+    Rules that fail to compile keep ``qty_op`` None and explain why in
+    ``qty_error``; they generate no pulltags.
+    """
+    ops, operands, errors = [], [], []
+    for logic in communities_df["item_code_qty"]:
+        try:
+            op, operand = compile_quantity_logic(logic)
+            ops.append(op); operands.append(operand); errors.append(None)
+        except ValueError as e:
+            ops.append(None); operands.append(np.nan); errors.append(str(e))
+    return communities_df.assign(qty_op=ops, qty_operand=operands, qty_error=errors)
+
+
+def prepare_community_rules(communities_df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize join keys and compile quantity logic; do this once per load."""
+    return compile_quantity_rules(normalize_communities(communities_df))
+
+
+def invalid_quantity_rules(rules_df: pd.DataFrame) -> pd.DataFrame:
+    """Validation report: the compiled rules whose quantity logic was rejected."""
+    cols = ["job_number", "roof_type", "cost_code", "item_code", "item_code_qty", "qty_error"]
+    return rules_df.loc[rules_df["qty_error"].notna(), cols].reset_index(drop=True)
+
+
+def compute_quantities(units_budget, ops, operands, item_codes) -> np.ndarray:
+    """Vectorized compute_quantity(): NaN where the legacy helper returned None."""
+    units    = np.asarray(units_budget, dtype=float)
+    ops      = np.asarray(ops, dtype=object)
+    operands = np.asarray(operands, dtype=float)
+
+    raw = np.full(units.shape, np.nan)
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        raw = np.where(ops == QTY_MUL, units * operands, raw)
+        raw = np.where(ops == QTY_DIV, units / operands, raw)
+    raw = np.where(ops == QTY_IDENTITY, units, raw)
+    raw = np.where(ops == QTY_CONST, operands, raw)
+    raw[~np.isfinite(raw)] = np.nan  # overflow: compute_quantity() gave None
+
+    qty = np.ceil(raw)
+    no_round = np.array(
+        [isinstance(c, str) and bool(c) and c.upper() in NO_ROUND_ITEMS for c in item_codes],
+        dtype=bool,
+    ).reshape(units.shape)
+    if no_round.any():
+        # Python's round() keeps results identical to compute_quantity()
+        qty[no_round] = [round(float(x), 2) for x in raw[no_round]]
+    return qty
+
+
+class RoofIndex(NamedTuple):
+    """Cost code → roof types, plus each roof type's priority (lower wins)."""
+    by_code: dict[str, tuple[str, ...]]
+    priority: dict[str, int]
+
+
+def build_roof_index(roof_type_df: pd.DataFrame) -> RoofIndex:
+    """Build the cost-code index once from the ``roof_type`` table.
+
+    Priority is a roof type's order of first appearance in ``roof_type_df``;
+    ``load_roof_type`` sorts by roof type, so ties go to the alphabetically
+    first roof type, stable between loads.
+    """
+    by_code, priority = {}, {}
+    for roof_type, cost_code in zip(roof_type_df["roof_type"], roof_type_df["cost_code"]):
+        if pd.isna(roof_type) or pd.isna(cost_code):
+            continue
+        roof_type = str(roof_type).strip()
+        priority.setdefault(roof_type, len(priority))
+        roofs = by_code.setdefault(str(cost_code).upper(), [])
+        if roof_type not in roofs:
+            roofs.append(roof_type)
+    return RoofIndex(
+        {code: tuple(sorted(roofs, key=priority.__getitem__)) for code, roofs in by_code.items()},
+        priority,
+    )
+
+
+def resolve_lot_roofs(df_budget: pd.DataFrame, roof_index: RoofIndex) -> pd.DataFrame:
+    """Resolve the roof type of every lot in the budget at once.
+
+    Returns one row per lot with ``job_number, lot_number, roof_type,
+    candidates``.  ``candidates`` lists every matching roof type in priority
+    order; ``roof_type`` is the first of them, or None when nothing matches.
+    """
+    lot_codes = (
+        df_budget[["job_number", "lot_number", "cost_code"]]
+        .dropna(subset=["job_number", "lot_number"])
+        .assign(cost_code=lambda d: d["cost_code"].astype(str).str.upper())
+        .drop_duplicates()
+    )
+    index_df = pd.DataFrame(
+        [(code, rt, roof_index.priority[rt]) for code, roofs in roof_index.by_code.items() for rt in roofs],
+        columns=["cost_code", "roof_type", "priority"],
+    )
+    hits = (
+        lot_codes.merge(index_df, on="cost_code", how="inner")
+        .drop_duplicates(["job_number", "lot_number", "roof_type"])
+        .sort_values("priority", kind="stable")
+        .groupby(["job_number", "lot_number"], sort=False)["roof_type"]
+        .agg(tuple)
+        .rename("candidates")
+        .reset_index()
+    )
+    lots = (
+        lot_codes[["job_number", "lot_number"]]
+        .drop_duplicates()
+        .merge(hits, on=["job_number", "lot_number"], how="left")
+        .sort_values(["job_number", "lot_number"], kind="stable")
+        .reset_index(drop=True)
+    )
+    # object dtype even with zero lots, so callers can use .str on candidates
+    lots["candidates"] = pd.Series([c if isinstance(c, tuple) else () for c in lots["candidates"]],
+                                   index=lots.index, dtype=object)
+    lots["roof_type"]  = pd.Series([c[0] if c else None for c in lots["candidates"]],
+                                   index=lots.index, dtype=object)
+    return lots[["job_number", "lot_number", "roof_type", "candidates"]]
+
+
+def match_lot_roofs(df_budget: pd.DataFrame, roof_index: RoofIndex) -> pd.DataFrame:
+    """Return ``job_number, lot_number, roof_type`` for every lot with a roof match."""
+    resolved = resolve_lot_roofs(df_budget, roof_index)
+    return resolved.dropna(subset=["roof_type"])[["job_number", "lot_number", "roof_type"]].reset_index(drop=True)
+
+
+def generate_pulltags(
+    df_budget: pd.DataFrame,
+    communities_df: pd.DataFrame,
+    items_master_df: pd.DataFrame,
+    roof_type_df: pd.DataFrame | None,
+    username: str,
+    roof_index: RoofIndex | None = None,
+) -> pd.DataFrame:
+    """Return the pulltag rows (``PULLTAG_COLUMNS``) for every lot in ``df_budget``.
+
+    ``communities_df`` should come from prepare_community_rules(); raw rules
+    are prepared on the fly.  Pass a prebuilt ``roof_index`` to skip
+    rebuilding it from ``roof_type_df``.
+    """
+    budget = (
+        df_budget[["job_number", "lot_number", "cost_code", "units_budget"]]
+        .dropna(subset=["job_number", "lot_number"])
+        .reset_index(drop=True)
+    )
+    budget["_line"] = range(len(budget))
+    if roof_index is None:
+        roof_index = build_roof_index(roof_type_df)
+    lot_roofs = match_lot_roofs(budget, roof_index)
+    if lot_roofs.empty:  # e.g. item lines before the first job header
+        return pd.DataFrame(columns=PULLTAG_COLUMNS)
+
+    lines = budget.merge(lot_roofs, on=["job_number", "lot_number"], how="inner")
+    lines["job_prefix"] = lines["job_number"].astype(str).str[:5]
+    lines["cost_code"]  = lines["cost_code"].astype(str).str.strip().str.upper()
+
+    if "qty_op" not in communities_df.columns:
+        communities_df = prepare_community_rules(communities_df)
+    rules = communities_df[["job_number", "roof_type", "cost_code", "item_code", "qty_op", "qty_operand"]]
+    rules = rules.assign(job_prefix=rules["job_number"].str[:5], _rule=range(len(rules))).drop(columns="job_number")
+    rules = rules[rules["qty_op"].notna()]
+
+    tags = lines.merge(rules, on=["job_prefix", "roof_type", "cost_code"], how="inner")
+    tags["quantity"] = compute_quantities(
+        tags["units_budget"], tags["qty_op"], tags["qty_operand"], tags["item_code"]
+    )
+    tags = tags[tags["quantity"].notna()]
+
+    items = (
+        items_master_df[["item_code", "description", "uom"]]
+        .assign(item_code=items_master_df["item_code"].str.strip())
+        .dropna(subset=["item_code"])
+        .drop_duplicates("item_code", keep="first")
+    )
+    tags = tags.merge(items, on="item_code", how="inner")
+    tags = tags.sort_values(["job_number", "lot_number", "_line", "_rule"], kind="stable").reset_index(drop=True)
+
+    n = len(tags)
+    out = pd.DataFrame({
+        "uid":              [str(uuid.uuid4()) for _ in range(n)],
+        "job_number":       tags["job_number"],
+        "lot_number":       tags["lot_number"],
+        "roof_type":        tags["roof_type"],
+        "item_code":        tags["item_code"],
+        "cost_code":        tags["cost_code"],
+        "description":      tags["description"],
+        "quantity":         tags["quantity"].astype(float),
+        "kitted_qty":       0,
+        "shorted":          0,
+        "backorder_qty":    0,
+        "backorder_status": "none",
+        "status":           "pending",
+        "uploaded_on":      datetime.utcnow().isoformat(),
+        "requested_on":     None,
+        "kitted_on":        None,
+        "resolved_on":      None,
+        "exported_on":      None,
+        "warehouse":        None,
+        "uom":              tags["uom"],
+        "batch_id":         None,
+        "updated_by":       username,
+        "requested_by":     None,
+    }, columns=PULLTAG_COLUMNS)
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# Revised-budget diff
+# ──────────────────────────────────────────────────────────────────────────
+DIFF_NEW, DIFF_CHANGED, DIFF_UNCHANGED, DIFF_REMOVED = "new", "changed", "unchanged", "removed"
+DIFF_KEY = ["job_number", "lot_number", "cost_code", "item_code"]
+
+
+def _pair_rows(gen: pd.DataFrame, old: pd.DataFrame, on: list[str]) -> pd.DataFrame:
+    # Pair the n-th generated row of each ``on`` group with the n-th existing one
+    gen = gen.assign(_occ=gen.groupby(on, sort=False, dropna=False).cumcount())
+    old = old.assign(_occ=old.groupby(on, sort=False, dropna=False).cumcount())
+    return gen[on + ["_occ", "_g"]].merge(old[on + ["_occ", "_o"]], on=on + ["_occ"])[["_g", "_o"]]
+
+
+def diff_pulltags(generated: pd.DataFrame, existing: pd.DataFrame) -> pd.DataFrame:
+    """Classify generated vs. existing pulltags for the same job/lot set.
+
+    Rows are matched on (job, lot, cost code, item code), in passes: same
+    uid first (a re-submitted budget regenerates its deterministic uids),
+    then same quantity, then an occurrence number for the repeats left over.
+    Returns the generated columns plus ``diff`` (new / changed / unchanged /
+    removed) and the existing row's ``existing_uid``, ``existing_quantity``
+    and ``existing_status``.  Removed rows only carry the key and existing_*
+    columns.
+    """
+    cols = ["uid", "quantity", "status"]
+    gen = generated.reset_index(drop=True)
+    gen = gen.assign(_g=range(len(gen)), _qty=pd.to_numeric(gen["quantity"], errors="coerce").round(6))
+    old = existing.reindex(columns=DIFF_KEY + cols + ["uploaded_on"])
+    old = old.sort_values(["uploaded_on", "uid"], kind="stable", na_position="last").reset_index(drop=True)
+    old = old.assign(_o=range(len(old)), _qty=pd.to_numeric(old["quantity"], errors="coerce").round(6))
+
+    pairs = []
+    for on in (DIFF_KEY + ["uid"], DIFF_KEY + ["_qty"], DIFF_KEY):
+        paired_g = set().union(*(p["_g"] for p in pairs))
+        paired_o = set().union(*(p["_o"] for p in pairs))
+        g = gen[~gen["_g"].isin(paired_g)]
+        o = old[~old["_o"].isin(paired_o)]
+        if "uid" in on:
+            g, o = g[g["uid"].notna()], o[o["uid"].notna()]
+        pairs.append(_pair_rows(g, o, on))
+    pairs = pd.concat(pairs, ignore_index=True)
+
+    old_cols = old[["_o"] + cols].rename(columns={c: f"existing_{c}" for c in cols})
+    matched = gen.merge(pairs, on="_g", how="left").merge(old_cols, on="_o", how="left")
+    removed = (
+        old[~old["_o"].isin(pairs["_o"])][DIFF_KEY + cols]
+        .rename(columns={c: f"existing_{c}" for c in cols})
+    )
+    merged = pd.concat([matched, removed], ignore_index=True)
+
+    same_qty = np.isclose(
+        pd.to_numeric(merged["quantity"], errors="coerce").astype(float),
+        pd.to_numeric(merged["existing_quantity"], errors="coerce").astype(float),
+    )
+    is_removed = np.arange(len(merged)) >= len(matched)
+    merged["diff"] = np.select(
+        [~is_removed & merged["_o"].isna(), is_removed, same_qty],
+        [DIFF_NEW, DIFF_REMOVED, DIFF_UNCHANGED],
+        default=DIFF_CHANGED,
+    )
+    return merged.drop(columns=["_g", "_o", "_qty"]).reset_index(drop=True)
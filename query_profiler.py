@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from urllib.parse import parse_qsl
+
+import pandas as pd
+
+import perf_metrics
+
+# ──────────────────────────────────────────────────────────────────────────
+# Supabase query profiler
+#
+# httpx hooks on the shared client record every PostgREST call (table,
+# operation, filters, columns, rows, bytes, latency) into an in-memory ring
+# and a rotating JSONL file; calls slower than QUERY_SLOW_MS are flagged.
+# ──────────────────────────────────────────────────────────────────────────
+RING_SIZE      = int(os.getenv("QUERY_PROFILE_SIZE", "1000"))
+SLOW_MS        = float(os.getenv("QUERY_SLOW_MS", "500"))
+LOG_PATH       = os.getenv("QUERY_LOG_PATH", "logs/supabase_queries.jsonl")  # "" disables the file
+LOG_MAX_MB     = float(os.getenv("QUERY_LOG_MAX_MB", "10"))
+LOG_BACKUPS    = int(os.getenv("QUERY_LOG_BACKUPS", "3"))
+
+OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+NON_FILTER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+_ring = deque(maxlen=RING_SIZE)
+_ring_lock = threading.Lock()
+_log = logging.getLogger("supabase_queries")
+_log.propagate = False
+
+
+def _init_file_log():
+    if not LOG_PATH or _log.handlers:
+        return
+    try:
+        os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+        handler = RotatingFileHandler(LOG_PATH, maxBytes=int(LOG_MAX_MB * 1024 * 1024), backupCount=LOG_BACKUPS)
+    except OSError:
+        return  # read-only disk: keep the in-memory ring only
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _log.addHandler(handler)
+    _log.setLevel(logging.INFO)
+
+
+_init_file_log()
+
+
+def describe_request(request) -> dict | None:
+    """Split a PostgREST request into table / operation / columns / filters."""
+    path = request.url.path
+    if "/rest/v1/" not in path:
+        return None
+    resource = path.split("/rest/v1/", 1)[1]
+    op = OPERATIONS.get(request.method, request.method.lower())
+    if resource.startswith("rpc/"):
+        op, resource = "rpc", resource[4:]
+    elif op == "insert" and "resolution=" in request.headers.get("prefer", ""):
+        op = "upsert"
+
+    params = parse_qsl(request.url.query.decode(), keep_blank_values=True)
+    filters = [(col, val) for col, val in params if col not in NON_FILTER_PARAMS]
+    return {
+        "table":   resource,
+        "op":      op,
+        "columns": dict(params).get("select", ""),
+        "filters": "&".join(f"{col}={val}" for col, val in filters),
+        # operators only, so the same query shape groups together
+        "shape":   ",".join(f"{col}:{val.split('.', 1)[0]}" for col, val in filters),
+        "order":   dict(params).get("order", ""),
+    }
+
+
+def on_request(request):
+    request.extensions["profiler_started"] = time.perf_counter()
+
+
+def on_response(response):
+    request = response.request
+    started = request.extensions.get("profiler_started")
+    info = describe_request(request)
+    if started is None or info is None:
+        return
+    response.read()
+    latency_ms = (time.perf_counter() - started) * 1000
+    stats = perf_metrics.current()
+    record = {
+        "ts":         time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **info,
+        "status":     response.status_code,
+        "rows":       perf_metrics.rows_from_content_range(response.headers.get("content-range")),
+        "req_bytes":  len(request.content or b""),
+        "resp_bytes": response.num_bytes_downloaded or len(response.content),
+        "latency_ms": round(latency_ms, 1),
+        "slow":       latency_ms >= SLOW_MS,
+        "tab":        stats.tab if stats else None,
+    }
+    with _ring_lock:
+        _ring.append(record)
+    if _log.handlers:
+        _log.info(json.dumps(record))
+
+
+REQUEST_HOOKS  = [on_request]
+RESPONSE_HOOKS = [on_response]
+
+
+def recent() -> pd.DataFrame:
+    with _ring_lock:
+        rows = list(_ring)
+    return pd.DataFrame(rows)
+
+
+def hot_spots(df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Calls grouped by table / operation / filter shape, costliest first."""
+    df = recent() if df is None else df
+    if df.empty:
+        return df
+    grouped = df.groupby(["table", "op", "shape"], dropna=False)
+    return pd.DataFrame({
+        "calls":    grouped.size(),
+        "p50_ms":   grouped["latency_ms"].median().round(1),
+        "p95_ms":   grouped["latency_ms"].quantile(0.95).round(1),
+        "max_ms":   grouped["latency_ms"].max(),
+        "total_ms": grouped["latency_ms"].sum().round(0),
+        "rows":     grouped["rows"].sum(),
+        "kb":       (grouped["resp_bytes"].sum() / 1024).round(1),
+        "slow":     grouped["slow"].sum(),
+    }).sort_values("total_ms", ascending=False).reset_index()
@@ -0,0 +1,41 @@
+-- Parsed budget lines, stored when a budget is submitted from Budget Upload
+-- so pulltags can be regenerated after a rule change without the PDF.
+
+create table if not exists public.budget_lines (
+    id            bigint generated always as identity primary key,
+    upload_hash   text             not null,  -- SHA-256 of the uploaded PDF
+    job_number    text             not null,
+    lot_number    text             not null,
+    line_no       integer          not null,  -- order of the line within its lot
+    community     text,
+    cost_code     text             not null,
+    description   text,
+    units_budget  double precision not null,
+    uom           text,
+    uploaded_by   text,
+    uploaded_on   timestamptz      not null default now(),
+    unique (upload_hash, job_number, lot_number, line_no)
+);
+
+create index if not exists budget_lines_job_lot_idx
+    on public.budget_lines (job_number, lot_number, uploaded_on desc);
+
+-- Only the most recent upload of each lot (a revised budget replaces it)
+create or replace view public.latest_budget_lines as
+select bl.*
+from public.budget_lines bl
+join (
+    select distinct on (job_number, lot_number) job_number, lot_number, upload_hash
+    from public.budget_lines
+    order by job_number, lot_number, uploaded_on desc
+) latest using (job_number, lot_number, upload_hash);
+
+-- One row per job for the "regenerate from stored budget" picker
+create or replace view public.budget_line_jobs as
+select job_number,
+       min(community)             as community,
+       count(distinct lot_number) as lots,
+       count(*)                   as lines,
+       max(uploaded_on)           as last_uploaded
+from public.latest_budget_lines
+group by job_number;
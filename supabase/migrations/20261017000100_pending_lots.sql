@@ -0,0 +1,11 @@
+-- Pending lots per job for Super Request, so the tab asks for one job's lots
+-- instead of downloading job/lot/status for every pulltag.
+
+create index if not exists pulltags_job_status_lot_idx
+    on public.pulltags (job_number, status, lot_number);
+
+-- One row per (job, lot) that still has a pending pulltag
+create or replace view public.pending_lots as
+select distinct job_number, lot_number
+from public.pulltags
+where status = 'pending';
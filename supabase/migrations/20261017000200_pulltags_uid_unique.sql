@@ -0,0 +1,6 @@
+-- Budget Upload writes pulltags with upsert(on_conflict="uid") so that a
+-- re-submitted budget is a no-op; PostgREST needs a unique constraint or
+-- index on the conflict column, or every batch fails with 42P10.
+
+create unique index if not exists pulltags_uid_key
+    on public.pulltags (uid);
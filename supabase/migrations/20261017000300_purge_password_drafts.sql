@@ -0,0 +1,6 @@
+-- field_tracker no longer drafts password inputs; drop the plaintext
+-- values User Management's password fields had already saved.
+
+delete from public.drafts
+ where tab = 'user_management'
+   and key in ('new_password', 'edit_user_pw');
@@ -0,0 +1,68 @@
+import os
+
+import httpx
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from supabase import Client, ClientOptions, create_client
+
+import perf_metrics
+import query_profiler
+
+# ──────────────────────────────────────────────────────────────────────────
+# Shared Supabase client  (one per process, pooled keep-alive connections)
+# ──────────────────────────────────────────────────────────────────────────
+CONNECT_TIMEOUT_S = float(os.getenv("SUPABASE_CONNECT_TIMEOUT_S", "5"))
+READ_TIMEOUT_S    = float(os.getenv("SUPABASE_READ_TIMEOUT_S", "60"))
+POOL_SIZE         = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+
+# (connect, read) for raw requests calls, e.g. the edge functions
+HTTP_TIMEOUT = (CONNECT_TIMEOUT_S, READ_TIMEOUT_S)
+
+
+def _setting(name: str) -> str | None:
+    value = os.environ.get(name)
+    if value:
+        return value
+    try:
+        return st.secrets.get(name)
+    except Exception:  # no secrets.toml on Render
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def get_http_client() -> httpx.Client:
+    """Process-wide httpx pool every Supabase client sends its requests through."""
+    return httpx.Client(
+        timeout=httpx.Timeout(READ_TIMEOUT_S, connect=CONNECT_TIMEOUT_S),
+        limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        event_hooks={
+            "request":  query_profiler.REQUEST_HOOKS,
+            # per-rerun counters, then the per-call profile / slow-query log
+            "response": perf_metrics.RESPONSE_HOOKS + query_profiler.RESPONSE_HOOKS,
+        },
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_supabase(service_role: bool = False) -> Client:
+    """Return the shared Supabase client (anon key, or the service-role key)."""
+    url = _setting("SUPABASE_URL")
+    key = _setting("SUPABASE_SERVICE_ROLE_KEY" if service_role else "SUPABASE_KEY")
+    if not url or not key:
+        st.error("❌ Missing SUPABASE_URL or Supabase key in environment variables.")
+        st.stop()
+    return create_client(url, key, options=ClientOptions(httpx_client=get_http_client()))
+
+
+@st.cache_resource(show_spinner=False)
+def get_http_session() -> requests.Session:
+    """Keep-alive requests session for raw REST / edge-function calls.
+
+    requests has no session-wide timeout; pass ``timeout=HTTP_TIMEOUT``.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
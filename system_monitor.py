@@ -1,16 +1,195 @@
 import streamlit as st
+import pandas as pd
 import psutil
 import os
+import threading
+import time
+from collections import deque
+
+import memory_inspector
+import perf_metrics
+import query_profiler
+from tab_registry import import_timings
+
+SAMPLE_INTERVAL_S = float(os.getenv("SYSMON_INTERVAL_S", "2"))
+HISTORY_MINUTES   = float(os.getenv("SYSMON_HISTORY_MIN", "10"))
+
+# --- Background sampler (one per process, shared by every session) ----------
+class _Sampler:
+    """Daemon thread appending a process sample to a fixed-size ring buffer."""
+
+    def __init__(self, interval_s=SAMPLE_INTERVAL_S, history_min=HISTORY_MINUTES):
+        self.interval_s = interval_s
+        self.samples = deque(maxlen=max(1, int(history_min * 60 / interval_s)))
+        self._lock = threading.Lock()
+        self._process = psutil.Process(os.getpid())
+        self._process.cpu_percent(None)  # prime: first non-blocking call returns 0.0
+        self._thread = threading.Thread(target=self._run, name="system-monitor", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        p = self._process
+        with p.oneshot():
+            try:
+                conns = len(p.net_connections(kind="inet"))
+            except (psutil.AccessDenied, AttributeError):
+                conns = None
+            return {
+                "time":        pd.Timestamp.now(),
+                "rss_mb":      p.memory_info().rss / (1024 * 1024),
+                "cpu_percent": p.cpu_percent(None),  # since the previous sample
+                "threads":     p.num_threads(),
+                "connections": conns,
+            }
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_s)
+            try:
+                sample = self._sample()
+            except Exception:
+                continue  # never let the monitor take the app down
+            with self._lock:
+                self.samples.append(sample)
+
+    def latest(self):
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def history(self) -> pd.DataFrame:
+        with self._lock:
+            rows = list(self.samples)
+        return pd.DataFrame(rows)
+
+
+@st.cache_resource(show_spinner=False)
+def get_sampler() -> _Sampler:
+    return _Sampler()
+
 
 def show_system_metrics(user_role):
     if user_role != "exec":
         return
 
-    process = psutil.Process(os.getpid())
-    mem_bytes = process.memory_info().rss
-    mem_mb = mem_bytes / (1024 * 1024)
-    cpu_percent = process.cpu_percent(interval=0.5)
+    sampler = get_sampler()
+    latest = sampler.latest()
 
     st.sidebar.markdown("## 🔒 Exec System Monitor")
-    st.sidebar.markdown(f"🧠 **Memory Usage:** {mem_mb:.2f} MB")
-    st.sidebar.markdown(f"🧮 **CPU Usage:** {cpu_percent:.2f}%")
\ No newline at end of file
+    if latest is None:
+        st.sidebar.caption("Collecting first sample…")
+        return
+
+    st.sidebar.markdown(f"🧠 **Memory Usage:** {latest['rss_mb']:.2f} MB")
+    st.sidebar.markdown(f"🧮 **CPU Usage:** {latest['cpu_percent']:.2f}%")
+    conns = "n/a" if latest["connections"] is None else latest["connections"]
+    st.sidebar.markdown(f"🧵 **Threads:** {latest['threads']} · 🔌 **Connections:** {conns}")
+
+    history = sampler.history().set_index("time")
+    minutes = len(history) * sampler.interval_s / 60
+    with st.sidebar.expander(f"📈 Last {minutes:.0f} min"):
+        for column, label in (("rss_mb", "Memory (MB)"), ("cpu_percent", "CPU (%)"),
+                              ("threads", "Threads"), ("connections", "Connections")):
+            st.caption(label)
+            st.line_chart(history[column], height=80)
+
+def show_tab_import_times(user_role):
+    if user_role != "exec":
+        return
+
+    timings = import_timings()
+    if not timings:
+        return
+    with st.sidebar.expander(f"⏱️ Tab import times ({len(timings)} loaded)"):
+        st.dataframe(timings, use_container_width=True, hide_index=True)
+
+
+def show_rerun_metrics(user_role):
+    if user_role != "exec":
+        return
+
+    last = st.session_state.get("perf_last_rerun")
+    if last:
+        st.sidebar.markdown(
+            f"⏱️ **Last rerun** ({last['tab']}): {last['wall_ms']:.0f} ms · "
+            f"{last['queries']} queries · {last['rows']} rows · {last['kb']:.1f} KB"
+        )
+
+    history = perf_metrics.history()
+    if history.empty:
+        return
+    with st.sidebar.expander(f"🐢 Tab timings ({len(history)} reruns)"):
+        st.dataframe(perf_metrics.tab_summary(history), use_container_width=True, hide_index=True)
+        st.download_button(
+            "Download rerun history (CSV)",
+            history.to_csv(index=False),
+            "rerun_history.csv",
+            key="perf_history_csv",
+        )
+
+
+def show_query_profile(user_role):
+    if user_role != "exec":
+        return
+
+    calls = query_profiler.recent()
+    if calls.empty:
+        return
+    slow = calls[calls["slow"]]
+    label = f"🔍 Supabase queries ({len(calls)} recent"
+    label += f", {len(slow)} slow ≥ {query_profiler.SLOW_MS:.0f} ms)" if len(slow) else ")"
+    with st.sidebar.expander(label):
+        st.caption("Hot spots by table / operation / filter shape")
+        st.dataframe(query_profiler.hot_spots(calls), use_container_width=True, hide_index=True)
+        if not slow.empty:
+            st.caption("Slowest calls")
+            st.dataframe(
+                slow.sort_values("latency_ms", ascending=False)
+                [["ts", "tab", "table", "op", "filters", "rows", "latency_ms"]].head(20),
+                use_container_width=True, hide_index=True,
+            )
+        st.download_button(
+            "Download query log (CSV)",
+            calls.to_csv(index=False),
+            "supabase_queries.csv",
+            key="query_profile_csv",
+        )
+
+
+def show_memory_inspector(user_role):
+    if user_role != "exec":
+        return
+
+    sessions = memory_inspector.session_summary()
+    total_mb = sessions["state_mb"].sum() if not sessions.empty else 0
+    with st.sidebar.expander(f"🧠 Session memory ({len(sessions)} sessions, {total_mb:.1f} MB)"):
+        st.caption("Session state per live session")
+        st.dataframe(sessions, use_container_width=True, hide_index=True)
+
+        entries = memory_inspector.large_entries()
+        if not entries.empty:
+            st.caption("Large entries (≥ 0.5 MB)")
+            st.dataframe(entries, use_container_width=True, hide_index=True)
+        if st.button(
+            f"🧹 Evict entries ≥ {memory_inspector.EVICT_MIN_MB:g} MB "
+            f"from sessions idle ≥ {memory_inspector.EVICT_AFTER_MIN:g} min",
+            key="memory_evict",
+            disabled=entries.empty or not entries["stale"].any(),
+        ):
+            count, freed = memory_inspector.evict_stale()
+            st.success(f"Evicted {count} keys ({freed:.1f} MB).")
+
+        st.markdown("---")
+        # Tracing is process-wide: only an explicit click starts or stops it
+        if not memory_inspector.is_tracing():
+            st.caption("Allocation tracing (tracemalloc) is off.")
+            if st.button("▶️ Start tracing", key="memory_trace_start"):
+                memory_inspector.start_tracing()
+                st.rerun()
+            return
+        if st.button("⏹️ Stop tracing", key="memory_trace_stop"):
+            memory_inspector.stop_tracing()
+            st.rerun()
+        if st.button("📸 Set baseline", key="memory_baseline"):
+            memory_inspector.set_baseline()
+        st.caption("Growth since baseline" if memory_inspector.has_baseline() else "Top allocation sites")
+        st.dataframe(memory_inspector.top_allocations(), use_container_width=True, hide_index=True)
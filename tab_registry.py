@@ -0,0 +1,47 @@
+import importlib
+import sys
+import threading
+import time
+
+# ──────────────────────────────────────────────────────────────────────────
+# Lazy tab loading
+#
+# Tabs are imported the first time someone opens them, not at app start, so
+# a session only pays (time, RSS, Supabase clients) for the tabs its role can
+# reach.  Modules stay in sys.modules, so the cost is paid once per process.
+# ──────────────────────────────────────────────────────────────────────────
+_timings = {}  # module path → (seconds, imported_at)
+_lock = threading.Lock()
+
+
+def load_tab(module_path: str):
+    """Import ``module_path`` on first use and return its ``run`` function."""
+    # Always go through import_module: it holds the per-module import lock,
+    # so a session never sees a module another session is still importing
+    # (sys.modules has it before ``run`` is defined).
+    first = module_path not in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(module_path)
+    if first:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            _timings.setdefault(module_path, (elapsed, time.time()))
+    return module.run
+
+
+def import_timings() -> list[dict]:
+    """First-import cost of every tab loaded in this process, slowest first.
+
+    A tab's time includes any heavy dependency it was first to pull in
+    (e.g. pandas or pdfplumber).
+    """
+    with _lock:
+        items = list(_timings.items())
+    return sorted(
+        (
+            {"module": path, "import_s": round(secs, 3), "imported_at": time.strftime("%H:%M:%S", time.localtime(at))}
+            for path, (secs, at) in items
+        ),
+        key=lambda row: row["import_s"],
+        reverse=True,
+    )
@@ -2,14 +2,11 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from supabase import create_client
-import os
+from supabase_client import get_supabase
 from fpdf import FPDF
 
 # Supabase client
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_KEY"]
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = get_supabase()
 
 # Assumes you already defined generate_pulltag_pdf somewhere
 def generate_pulltag_pdf(df: pd.DataFrame, title: str | None = None) -> bytes:
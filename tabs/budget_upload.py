@@ -1,89 +1,50 @@
 import streamlit as st
 import pandas as pd
-import uuid, math, os, re, pdfplumber
-from datetime import datetime
-from supabase import create_client
+import io, zipfile
+from functools import partial
+from supabase_client import get_supabase
+import budget_cache
+import bulk_writer
+import budget_parser
+from pdf_text_backends import BACKENDS, DEFAULT_BACKEND
+from pulltag_engine import (
+    DIFF_CHANGED, DIFF_NEW, DIFF_REMOVED, DIFF_UNCHANGED, PULLTAG_COLUMNS,
+    build_roof_index, diff_pulltags, generate_pulltags, invalid_quantity_rules,
+    prepare_community_rules, resolve_lot_roofs,
+)
 
 # ──────────────────────────────────────────────────────────────────────────
 # Supabase connection
 # ──────────────────────────────────────────────────────────────────────────
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = get_supabase()
 
 # ──────────────────────────────────────────────────────────────────────────
-# Helper: fraction-friendly quantity logic
+# PDF budget parser  (layout profiles live in budget_parser)
 # ──────────────────────────────────────────────────────────────────────────
-NO_ROUND_ITEMS = {"NC134", "NC34"}
+def parse_pdf_budget_all_lots(pdf_path, workers: int | None = None, backend: str | None = None,
+                              profile: str | None = None) -> pd.DataFrame:
+    """Parse every lot in the budget; ``workers`` > 1 parses page ranges in parallel."""
+    return budget_parser.parse_budget(pdf_path, profile, workers=workers, backend=backend)
 
-def compute_quantity(units_budget: float, logic, item_code: str | None = None):
-    """Return qty, keeping fractions for NO_ROUND_ITEMS, ceilling for others."""
-    try:
-        if isinstance(logic, str) and "Units Budget" in logic:
-            if "*" in logic:
-                factor = float(logic.split("*")[-1].strip())
-                raw_qty = units_budget * factor
-            elif "/" in logic:
-                divisor = float(logic.split("/")[-1].strip())
-                raw_qty = units_budget / divisor
-            else:
-                raw_qty = units_budget
-        else:
-            raw_qty = float(logic)
+def iter_budget_pages(pdf_path, workers: int | None = None, backend: str | None = None,
+                      profile: str | None = None):
+    """Stream ``(page_number, [BudgetLine, ...])`` page by page."""
+    return budget_parser.iter_budget_pages(pdf_path, profile, workers=workers, backend=backend)
 
-        if item_code and item_code.upper() in NO_ROUND_ITEMS:
-            return round(raw_qty, 2)
-        return float(math.ceil(raw_qty))
-    except Exception:
-        return None
-
-# ──────────────────────────────────────────────────────────────────────────
-# PDF budget parser  (unchanged except for lot-regex upgrade)
-# ──────────────────────────────────────────────────────────────────────────
-LOT_RE = re.compile(r"""^\s*(?P<lot>\d{1,4}[A-Z]?)\s+\d+\s+.+?\(\w+\)""", re.VERBOSE)
-ITEM_RE = re.compile(
-    r"""^\s*([A-Za-z0-9()+\"'#/\-]{2,})\s+(.+?)\s+([\d.]+)\s+"""
-    r"""(EA|SQ|LF|ROLL|BNDL|BUND|PC|BOX)(?:\s+.+)?$"""
-)
-
-def parse_pdf_budget_all_lots(pdf_path) -> pd.DataFrame:
-    rows, job_number, community, last_lot = [], None, None, None
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if not text:
-                continue
-            for line in text.splitlines():
-                if re.match(r"^\d{5}-\d{3}\s", line.strip()):
-                    job_number = re.match(r"^(\d{5}-\d{3})", line.strip()).group(1)
-                    community = line.strip().split(job_number)[-1].strip()
-                lot_match = LOT_RE.match(line)
-                if lot_match:
-                    last_lot = lot_match.group("lot")
-                if line.strip().startswith("L"):
-                    continue
-                m = ITEM_RE.match(line)
-                if m and last_lot:
-                    code, desc, qty, uom = m.groups()
-                    rows.append(
-                        dict(
-                            Community=community,
-                            Job_Number=job_number,
-                            Lot_Number=last_lot,
-                            Cost_Code=code.strip().upper(),
-                            Description=desc.strip(),
-                            Units_Budget=float(qty),
-                            UOM=uom,
-                        )
-                    )
-    return pd.DataFrame(rows)
+def iter_budget_lines(pdf_path, workers: int | None = None, backend: str | None = None,
+                      profile: str | None = None):
+    """Stream typed BudgetLine records page by page."""
+    return budget_parser.iter_budget_lines(pdf_path, profile, workers=workers, backend=backend)
 
 # ──────────────────────────────────────────────────────────────────────────
 # Cached lookups  (5-min TTL + manual refresh)
 # ─────────────────────────────────────────────────────────────────────────
 @st.cache_data(ttl=300, show_spinner=False)
 def load_communities():
-    return pd.DataFrame(supabase.table("communities").select("*").execute().data)
+    # Normalized + quantity logic compiled once per load, not per pulltag
+    return prepare_community_rules(
+        pd.DataFrame(supabase.table("communities").select("*").execute().data)
+    )
 
 @st.cache_data(ttl=300, show_spinner=False)
 def load_items_master():
@@ -93,9 +54,469 @@ def load_items_master():
 
 @st.cache_data(ttl=300, show_spinner=False)
 def load_roof_type():
+    # Roof-type priority is first appearance in this order, i.e. alphabetical:
+    # a lot matching several roof types gets the one that sorts first.  (The
+    # old per-lot loop took whichever the unordered select returned first.)
     return pd.DataFrame(
-        supabase.table("roof_type").select("roof_type, cost_code").execute().data
+        supabase.table("roof_type").select("roof_type, cost_code")
+        .order("roof_type").order("cost_code").execute().data
+    )
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def load_roof_index():
+    return build_roof_index(load_roof_type())
+
+# ──────────────────────────────────────────────────────────────────────────
+# Streaming parse  (progress by page, pulltags for finished lots)
+# ──────────────────────────────────────────────────────────────────────────
+def _stream_budget(pdf_bytes, backend, profile, generate):
+    """Read the PDF page by page, generating pulltags as each lot finishes.
+
+    Returns ``(df_budget, pulltags_df)``.  Each line is kept once, in page
+    order; lots only index into that list.
+    """
+    n_pages  = budget_parser.page_count(pdf_bytes, backend)
+    progress = st.progress(0.0, text=f"Reading page 0 / {n_pages}")
+    counter  = st.empty()
+
+    all_lines, lines_by_lot, generated = [], {}, {}  # lot → indices into all_lines
+    current = None
+
+    def flush(keys):
+        chunk = budget_parser.lines_to_frame(all_lines[i] for k in keys for i in lines_by_lot[k])
+        tags = generate(chunk)
+        for key in keys:
+            generated.pop(key, None)  # a lot that reappears is regenerated in full
+        for key, lot_tags in tags.groupby(["job_number", "lot_number"], sort=False):
+            generated[key] = lot_tags
+
+    for page_number, lines in iter_budget_pages(pdf_bytes, backend=backend, profile=profile):
+        finished = []
+        for line in lines:
+            key = (line.job_number, line.lot_number)
+            if key != current:
+                if current is not None:
+                    finished.append(current)
+                current = key
+            lines_by_lot.setdefault(key, []).append(len(all_lines))
+            all_lines.append(line)
+        if finished:
+            flush(list(dict.fromkeys(finished)))
+
+        progress.progress(page_number / max(n_pages, 1), text=f"Reading page {page_number} / {n_pages}")
+        counter.markdown(
+            f"📑 **{len(lines_by_lot)}** lots · **{len(all_lines)}** lines · "
+            f"**{sum(len(t) for t in generated.values())}** pulltags so far"
+        )
+
+    if current is not None:
+        flush([current])
+    progress.empty()
+
+    if generated:
+        pulltags_df = (
+            pd.concat(generated.values())
+            .sort_values(["job_number", "lot_number"], kind="stable")
+            .reset_index(drop=True)
+        )
+    else:
+        pulltags_df = pd.DataFrame()
+    return budget_parser.lines_to_frame(all_lines), pulltags_df
+
+# ──────────────────────────────────────────────────────────────────────────
+# Existing pulltags  (revised-budget diff)
+# ──────────────────────────────────────────────────────────────────────────
+UID_CHUNK = 200  # uids per in_() filter, keeps the request URL short
+
+def fetch_existing_pulltags(df_budget: pd.DataFrame) -> pd.DataFrame:
+    """All pulltags already stored for the budget's (job, lot) pairs, in one query."""
+    cols  = ["uid", "job_number", "lot_number", "cost_code", "item_code", "quantity", "status", "uploaded_on"]
+    pairs = df_budget[["job_number", "lot_number"]].dropna().drop_duplicates()
+    if pairs.empty:
+        return pd.DataFrame(columns=cols)
+    rows = bulk_writer.fetch_all(
+        lambda: supabase.table("pulltags").select(", ".join(cols))
+        .in_("job_number", sorted(pairs["job_number"].unique()))
+        .in_("lot_number", sorted(pairs["lot_number"].unique()))
+        .order("uid")
+    )
+    existing = pd.DataFrame(rows, columns=cols)
+    return existing.merge(pairs, on=["job_number", "lot_number"], how="inner")
+
+# ──────────────────────────────────────────────────────────────────────────
+# Stored budget lines  (regenerate without re-uploading the PDF)
+# ──────────────────────────────────────────────────────────────────────────
+BUDGET_LINE_KEY = "upload_hash,job_number,lot_number,line_no"
+
+def store_budget_lines(df_budget: pd.DataFrame, username: str):
+    """Save the parsed lines (with their ``upload_hash``); re-saving a budget is a no-op."""
+    lines = df_budget.dropna(subset=["job_number", "lot_number"])
+    lines = lines.assign(
+        line_no=lines.groupby(["upload_hash", "job_number", "lot_number"], sort=False).cumcount(),
+        uploaded_by=username,
+    )[["upload_hash", *budget_parser.BUDGET_COLUMNS, "line_no", "uploaded_by"]]
+    lines = lines.astype(object).where(lines.notna(), None)
+    return bulk_writer.bulk_upsert(supabase, "budget_lines", lines.to_dict("records"), on_conflict=BUDGET_LINE_KEY)
+
+def load_stored_budget(jobs: list[str]) -> pd.DataFrame:
+    """Latest stored lines for ``jobs``, typed like a fresh parse plus ``upload_hash``."""
+    rows = bulk_writer.fetch_all(
+        lambda: supabase.table("latest_budget_lines")
+        .select(", ".join(["upload_hash", *budget_parser.BUDGET_COLUMNS]))
+        .in_("job_number", jobs)
+        .order("job_number").order("lot_number").order("line_no")
+    )
+    df = pd.DataFrame(rows, columns=["upload_hash", *budget_parser.BUDGET_COLUMNS])
+    return df.astype(budget_parser.BUDGET_DTYPES)
+
+def _submit_delta(diff_df: pd.DataFrame, username: str, delete_removed: bool):
+    """Insert new rows, re-quantify changed pending rows, optionally drop removed ones."""
+    new_rows = diff_df.loc[diff_df["diff"] == DIFF_NEW, PULLTAG_COLUMNS]
+    changed  = diff_df[(diff_df["diff"] == DIFF_CHANGED) & (diff_df["existing_status"] == "pending")]
+    removed  = diff_df[(diff_df["diff"] == DIFF_REMOVED) & (diff_df["existing_status"] == "pending")]
+
+    errors = []
+    if not new_rows.empty:
+        bar = st.progress(0.0, text="Submitting…")
+        inserted, errors = bulk_writer.bulk_upsert(
+            supabase,
+            "pulltags",
+            new_rows.to_dict("records"),
+            progress=lambda done, total: bar.progress(done / total, text=f"Submitted {done} / {total}"),
+        )
+        bar.empty()
+        st.success(f"Inserted {inserted} new rows.")
+
+    # One update per distinct new quantity instead of one per row
+    for qty, grp in changed.groupby("quantity"):
+        for uids in bulk_writer.chunked(grp["existing_uid"].tolist(), UID_CHUNK):
+            try:
+                supabase.table("pulltags").update({"quantity": qty, "updated_by": username}) \
+                        .in_("uid", uids).eq("status", "pending").execute()
+            except Exception as e:
+                errors.append({"chunk": f"update qty={qty}", "rows": len(uids), "error": str(e)})
+    if not changed.empty:
+        st.success(f"Updated quantity on {len(changed)} pending rows.")
+
+    if delete_removed and not removed.empty:
+        for uids in bulk_writer.chunked(removed["existing_uid"].tolist(), UID_CHUNK):
+            try:
+                supabase.table("pulltags").delete().in_("uid", uids).eq("status", "pending").execute()
+            except Exception as e:
+                errors.append({"chunk": "delete", "rows": len(uids), "error": str(e)})
+        st.success(f"Deleted {len(removed)} removed pending rows.")
+
+    if errors:
+        st.error(f"Supabase write failed for {len(errors)} chunk(s):")
+        st.dataframe(pd.DataFrame(errors), use_container_width=True)
+
+def _save_budget_lines(df_budget: pd.DataFrame, username: str):
+    saved, errors = store_budget_lines(df_budget, username)
+    if errors:
+        st.warning(f"⚠️ Budget lines not fully saved ({len(errors)} chunk(s) failed); "
+                   "regenerating this budget later may be incomplete.")
+    else:
+        st.caption(f"💾 Saved {saved} new budget line(s) for later regeneration.")
+
+def _review_and_submit(pulltags_df: pd.DataFrame, df_budget: pd.DataFrame, username: str,
+                       store_lines: bool = True):
+    """Show the diff against stored pulltags and submit only the delta.
+
+    With ``store_lines`` the parsed budget is saved to ``budget_lines`` on
+    submit, or on its own with "Save budget lines only" (e.g. a re-upload
+    with no delta), so it can be regenerated later without the PDF.
+    """
+    diff_df = diff_pulltags(pulltags_df, fetch_existing_pulltags(df_budget))
+    counts  = diff_df["diff"].value_counts()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("🆕 New",       int(counts.get(DIFF_NEW, 0)))
+    c2.metric("✏️ Changed",   int(counts.get(DIFF_CHANGED, 0)))
+    c3.metric("✔️ Unchanged", int(counts.get(DIFF_UNCHANGED, 0)))
+    c4.metric("🗑️ Removed",   int(counts.get(DIFF_REMOVED, 0)))
+
+    changed = diff_df[diff_df["diff"] == DIFF_CHANGED]
+    removed = diff_df[diff_df["diff"] == DIFF_REMOVED]
+    locked  = pd.concat([changed, removed])
+    locked  = locked[locked["existing_status"] != "pending"]
+    if not changed.empty:
+        with st.expander(f"✏️ {len(changed)} changed quantities"):
+            st.dataframe(changed[["job_number", "lot_number", "cost_code", "item_code",
+                                  "existing_quantity", "quantity", "existing_status"]],
+                         use_container_width=True)
+    if not removed.empty:
+        with st.expander(f"🗑️ {len(removed)} stored rows no longer in this budget"):
+            st.dataframe(removed[["job_number", "lot_number", "cost_code", "item_code",
+                                  "existing_quantity", "existing_status"]],
+                         use_container_width=True)
+    if not locked.empty:
+        st.info(f"ℹ️ {len(locked)} changed/removed row(s) are past `pending` and will be left as is.")
+
+    delete_removed = False
+    if (removed["existing_status"] == "pending").any():
+        delete_removed = st.checkbox("Also delete removed rows that are still pending")
+
+    has_delta = bool(counts.get(DIFF_NEW, 0)) or (changed["existing_status"] == "pending").any() or delete_removed
+    c_submit, c_save = st.columns(2)
+    submit = c_submit.button("📤 Submit changes to Supabase", disabled=not has_delta)
+    save   = store_lines and c_save.button(
+        "💾 Save budget lines only",
+        help="Keep this budget for “Regenerate from stored budget” without submitting pulltags.",
+    )
+    if submit:
+        _submit_delta(diff_df, username, delete_removed)
+    if store_lines and (submit or save):
+        _save_budget_lines(df_budget, username)
+    elif store_lines and not has_delta:
+        st.caption("No pulltag changes to submit. Save the budget lines to regenerate from this budget later.")
+
+# ──────────────────────────────────────────────────────────────────────────
+# Shared steps  (single and batch upload)
+# ──────────────────────────────────────────────────────────────────────────
+def _load_generator(username: str):
+    """Load the reference tables once and return ``(communities_df, roof_index, generate)``."""
+    load_communities.clear();  # ensure new SQL is seen immediately
+    communities_df   = load_communities()
+    items_master_df  = load_items_master()
+    roof_type_df     = load_roof_type()
+    roof_index       = load_roof_index()
+
+    bad_rules = invalid_quantity_rules(communities_df)
+    if not bad_rules.empty:
+        with st.expander(f"⚠️ {len(bad_rules)} community rule(s) have invalid quantity logic"):
+            st.caption("These rules generate no pulltags until `item_code_qty` is fixed.")
+            st.dataframe(bad_rules, use_container_width=True)
+
+    generate = partial(
+        generate_pulltags,
+        communities_df=communities_df,
+        items_master_df=items_master_df,
+        roof_type_df=roof_type_df,
+        username=username,
+        roof_index=roof_index,
     )
+    return communities_df, roof_index, generate
+
+def _generate_per_upload(generate, df_budget: pd.DataFrame) -> pd.DataFrame:
+    """Generate each upload's lines on their own, tagged with its ``upload_hash``.
+
+    A lot that appears in two files gets one set of pulltags per file, each
+    keyed on its own file's hash, exactly as if the files were submitted alone.
+    """
+    frames = [
+        generate(lines).assign(upload_hash=upload_hash)
+        for upload_hash, lines in df_budget.groupby("upload_hash", sort=False)
+    ]
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def _assign_uids(pulltags_df: pd.DataFrame):
+    """Set stable uids keyed on the hash of the upload each pulltag came from.
+
+    Consumes ``pulltags_df["upload_hash"]``.  A budget submitted alone, in a
+    batch or regenerated from stored lines maps to the same pulltag uids.
+    """
+    uids = pd.Series(index=pulltags_df.index, dtype=object)
+    for upload_hash, rows in pulltags_df.groupby("upload_hash", sort=False):
+        uids[rows.index] = bulk_writer.deterministic_uids(rows, upload_hash)
+    pulltags_df["uid"] = uids
+    pulltags_df.drop(columns="upload_hash", inplace=True)
+
+def _report_lot_roofs(lot_roofs: pd.DataFrame):
+    n_matches  = lot_roofs["candidates"].str.len()
+    unmatched  = lot_roofs[n_matches == 0]
+    ambiguous  = lot_roofs[n_matches > 1]
+    if not unmatched.empty:
+        st.warning(f"⚠️ {len(unmatched)} lot(s) match no roof type and were skipped.")
+        st.dataframe(unmatched[["job_number", "lot_number"]], use_container_width=True)
+    if not ambiguous.empty:
+        st.warning(
+            f"⚠️ {len(ambiguous)} lot(s) match several roof types; "
+            "the alphabetically first roof type (first listed) was used."
+        )
+        st.dataframe(ambiguous, use_container_width=True)
+    with st.expander("🏠 Lot roof matches"):
+        st.dataframe(lot_roofs, use_container_width=True)
+
+# ──────────────────────────────────────────────────────────────────────────
+# Batch upload  (many PDFs or a zip, one combined submit)
+# ──────────────────────────────────────────────────────────────────────────
+def _collect_pdfs(uploads) -> dict:
+    """Flatten uploaded PDFs and zips into ``{name: bytes}``."""
+    pdfs = {}
+    for upload in uploads:
+        data = upload.getvalue()
+        if not upload.name.lower().endswith(".zip"):
+            pdfs[upload.name] = data
+            continue
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                name = info.filename
+                if info.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+                    continue
+                pdfs[f"{upload.name}/{name}"] = zf.read(info)
+    return pdfs
+
+def _batch_upload(backend: str, profile: str, username: str):
+    uploads = st.file_uploader(
+        "Upload Budget PDFs (or a zip of them)", type=["pdf", "zip"], accept_multiple_files=True
+    )
+    if not uploads:
+        return
+    try:
+        pdfs = _collect_pdfs(uploads)
+    except zipfile.BadZipFile as e:
+        st.error(f"🚫 Could not read zip: {e}")
+        return
+    if not pdfs:
+        st.error("🚫 No PDFs found in the upload.")
+        return
+
+    with st.spinner("Parsing and processing…"):
+        communities_df, roof_index, generate = _load_generator(username)
+
+        # Step-1 ─ parse every file not already cached, several at a time
+        hashes, frames, seconds, to_parse, failed = {}, {}, {}, {}, {}
+        for name, data in pdfs.items():
+            upload_hash, df = budget_cache.lookup(data, variant=f"{backend}.{profile}")
+            if upload_hash in hashes.values():
+                st.info(f"ℹ️ `{name}` is identical to another upload and was skipped.")
+                continue
+            hashes[name] = upload_hash
+            if df is None:
+                to_parse[name] = data
+            else:
+                frames[name], seconds[name] = df, None
+
+        if to_parse:
+            bar = st.progress(0.0, text=f"Parsed 0 / {len(to_parse)} files")
+            parsed = budget_parser.parse_many(to_parse, profile, backend=backend)
+            for done, (name, df, secs, error) in enumerate(parsed, 1):
+                bar.progress(done / len(to_parse), text=f"Parsed {done} / {len(to_parse)} files")
+                if error:
+                    failed[name] = error
+                    del hashes[name]
+                    continue
+                budget_cache.store(hashes[name], df, variant=f"{backend}.{profile}")
+                frames[name], seconds[name] = df, secs
+            bar.empty()
+
+        if failed:
+            st.error(f"🚫 {len(failed)} file(s) could not be parsed and were left out.")
+        if not hashes:
+            st.dataframe(pd.DataFrame({"file": list(failed), "error": list(failed.values())}),
+                         use_container_width=True)
+            return
+
+        names     = list(hashes)
+        df_budget = pd.concat([frames[n].assign(upload_hash=hashes[n]) for n in names], ignore_index=True)
+        lot_files = pd.concat(
+            [frames[n][["job_number", "lot_number"]].drop_duplicates().assign(file=n, upload_hash=hashes[n])
+             for n in names],
+            ignore_index=True,
+        )
+        overlap = lot_files[lot_files.duplicated(["job_number", "lot_number"], keep=False)]
+        if not overlap.empty:
+            st.warning("⚠️ Some lots appear in more than one file; each file's copy gets its own pulltags.")
+            st.dataframe(overlap.drop(columns="upload_hash"), use_container_width=True)
+
+        # Step-2 ─ generate each file's lines on their own (uids follow the file)
+        pulltags_df = _generate_per_upload(generate, df_budget)
+        lot_roofs   = resolve_lot_roofs(df_budget, roof_index)
+
+        # ------------------ per-file summary ------------------
+        unmatched = lot_roofs.loc[lot_roofs["candidates"].str.len() == 0, ["job_number", "lot_number"]]
+        keys      = ["job_number", "lot_number"]
+        tag_lots  = pulltags_df.groupby(keys + ["upload_hash"]).size().rename("n_tags").reset_index() \
+                    if not pulltags_df.empty else pd.DataFrame(columns=keys + ["upload_hash", "n_tags"])
+        per_lot   = (
+            lot_files.merge(tag_lots, on=keys + ["upload_hash"], how="left")
+            .merge(unmatched.assign(unmatched=1), on=keys, how="left")
+            .fillna({"n_tags": 0, "unmatched": 0})
+        )
+        per_file = per_lot.groupby("file", sort=False)[["n_tags", "unmatched"]].sum()
+        summary = pd.DataFrame({
+            "file":           names,
+            "parse_s":        [None if seconds[n] is None else round(seconds[n], 2) for n in names],
+            "cached":         [seconds[n] is None for n in names],
+            "lots":           [len(lot_files[lot_files["file"] == n]) for n in names],
+            "rows":           [len(frames[n]) for n in names],
+            "pulltags":       [int(per_file["n_tags"].get(n, 0)) for n in names],
+            "unmatched_lots": [int(per_file["unmatched"].get(n, 0)) for n in names],
+            "error":          None,
+        })
+        if failed:
+            summary = pd.concat(
+                [summary, pd.DataFrame({"file": list(failed), "error": list(failed.values())})],
+                ignore_index=True,
+            )
+        st.write("📊 **Per-file summary**")
+        st.dataframe(summary, use_container_width=True)
+        _report_lot_roofs(lot_roofs)
+
+        if pulltags_df.empty:
+            st.error("🚫 No pulltags generated.")
+            return
+
+        _assign_uids(pulltags_df)
+
+        st.success(f"✅ Generated {len(pulltags_df)} rows from {len(names)} file(s).")
+        st.dataframe(pulltags_df)
+        st.download_button("Download CSV",
+                           pulltags_df.to_csv(index=False),
+                           "pulltags_generated.csv")
+
+        _review_and_submit(pulltags_df, df_budget, username)
+
+# ──────────────────────────────────────────────────────────────────────────
+# Regenerate from stored budget lines  (no PDF, no re-parse)
+# ──────────────────────────────────────────────────────────────────────────
+def _regenerate_from_stored(username: str):
+    stored_jobs = pd.DataFrame(
+        supabase.table("budget_line_jobs").select("*").order("job_number").execute().data,
+        columns=["job_number", "community", "lots", "lines", "last_uploaded"],
+    )
+    if stored_jobs.empty:
+        st.info("ℹ️ No stored budgets yet — submit a budget upload first.")
+        return
+
+    labels = dict(zip(stored_jobs["job_number"], stored_jobs["community"].fillna("")))
+    jobs = st.multiselect(
+        "Jobs to regenerate",
+        list(labels),
+        format_func=lambda job: f"{job} {labels[job]}".strip(),
+    )
+    with st.expander("🗄️ Stored budgets"):
+        st.dataframe(stored_jobs, use_container_width=True)
+    if not jobs:
+        return
+
+    with st.spinner("Regenerating from stored budget lines…"):
+        communities_df, roof_index, generate = _load_generator(username)
+        df_budget = load_stored_budget(jobs)
+        if df_budget.empty:
+            st.error("🚫 No stored budget lines for the selected jobs.")
+            return
+
+        pulltags_df = _generate_per_upload(generate, df_budget)
+        lot_roofs   = resolve_lot_roofs(df_budget, roof_index)
+        _report_lot_roofs(lot_roofs)
+
+        if pulltags_df.empty:
+            st.error("🚫 No pulltags generated.")
+            return
+
+        # Same upload hashes as the original submit → same uids, so the diff
+        # below only touches what the rule change actually moved
+        _assign_uids(pulltags_df)
+
+        st.success(f"✅ Regenerated {len(pulltags_df)} rows for {len(jobs)} job(s) "
+                   f"from {len(df_budget)} stored budget lines.")
+        st.dataframe(pulltags_df)
+        st.download_button("Download CSV",
+                           pulltags_df.to_csv(index=False),
+                           "pulltags_regenerated.csv")
+
+        _review_and_submit(pulltags_df, df_budget, username, store_lines=False)
 
 # ──────────────────────────────────────────────────────────────────────────
 # Main Streamlit page
@@ -108,158 +529,91 @@ def run():
         load_communities.clear(); st.rerun()
 
     username = st.session_state.get("username", "unknown_user")
+    backend_names = list(BACKENDS)
+    backend = st.selectbox(
+        "Text extraction backend",
+        backend_names,
+        index=backend_names.index(DEFAULT_BACKEND) if DEFAULT_BACKEND in backend_names else 0,
+    )
+    profile_names = list(budget_parser.PROFILES)
+    profile = st.selectbox(
+        "Budget layout",
+        profile_names,
+        index=profile_names.index(budget_parser.DEFAULT_PROFILE) if budget_parser.DEFAULT_PROFILE in profile_names else 0,
+        format_func=lambda name: f"{name} — {budget_parser.PROFILES[name].description}",
+    )
+    mode = st.radio(
+        "Upload mode",
+        ["Single PDF", "Batch (many PDFs / zip)", "Regenerate from stored budget"],
+        horizontal=True,
+    )
+    if mode == "Regenerate from stored budget":
+        _regenerate_from_stored(username)
+        return
+    if mode != "Single PDF":
+        _batch_upload(backend, profile, username)
+        return
+
     pdf_file = st.file_uploader("Upload Budget PDF", type="pdf")
 
     if not pdf_file:
         return
 
-    with st.spinner("Parsing and processing…"):
-        # Step-1 ─ Parser output
-        df_budget = parse_pdf_budget_all_lots(pdf_file)
-        df_budget.columns = [col.strip().replace(" ", "_").lower() for col in df_budget.columns]
-        st.write("🟢 **Step-1 Parsed NPC rows** →", 
-                 df_budget[df_budget["cost_code"] == "NPC"])
+    with st.expander("🔬 Backend parity check"):
+        st.caption("Compares the job / lot / item lines each backend feeds the parser.")
+        if st.button("Run parity check"):
+            with st.spinner("Extracting with every backend…"):
+                diffs = budget_parser.compare_backends(pdf_file.getvalue(), profile)
+            if diffs.empty:
+                st.success("✅ Backends agree on every parsed line.")
+            else:
+                st.warning(f"⚠️ {len(diffs)} line(s) differ between backends.")
+                st.dataframe(diffs, use_container_width=True)
+
+    pdf_bytes = pdf_file.getvalue()
 
-        # Load reference tables (fresh)
-        load_communities.clear();  # ensure new SQL is seen immediately
-        communities_df   = load_communities()
-        items_master_df  = load_items_master()
-        roof_type_df     = load_roof_type()
-        # 🔧 Normalize string columns to prevent pandas matching bugs
-        communities_df["job_number"]  = communities_df["job_number"].astype(str).str.strip()
-        communities_df["roof_type"]   = communities_df["roof_type"].astype(str).str.strip()
-        communities_df["cost_code"]   = communities_df["cost_code"].astype(str).str.strip().str.upper()
-        communities_df["item_code"]   = communities_df["item_code"].astype(str).str.strip()
+    with st.spinner("Parsing and processing…"):
+        # Load reference tables (fresh) up front so lots can be generated
+        # while later pages are still being read
+        communities_df, roof_index, generate = _load_generator(username)
 
         st.write("🟢 **Step-2 Community NPC rows** →", 
                  communities_df[communities_df["item_code"].str.strip() == "NPC"]
                  [["job_number","roof_type","cost_code","item_code_qty"]])
 
-        results = []
-        grouped = df_budget.groupby(["job_number", "lot_number"])
-
-        for (job_number, lot_number), lot_df in grouped:
-            extracted_codes  = set(lot_df["cost_code"].str.upper())
-            matched_roof     = None
-            for rt in roof_type_df["roof_type"].unique():
-                if extracted_codes & set(
-                    roof_type_df[roof_type_df["roof_type"] == rt]["cost_code"].str.upper()
-                ):
-                    matched_roof = rt; break
-            if not matched_roof:
-                continue
+        # Step-1 ─ Parser output (cached by SHA-256 of the uploaded bytes)
+        # Another session streaming the same PDF holds its lock; we wait and
+        # reuse its result instead of parsing it a second time.
+        with budget_cache.claim(pdf_bytes, variant=f"{backend}.{profile}") as (upload_hash, df_budget):
+            if df_budget is None:
+                df_budget, pulltags_df = _stream_budget(pdf_bytes, backend, profile, generate)
+                budget_cache.store(upload_hash, df_budget, variant=f"{backend}.{profile}")
+            else:
+                pulltags_df = None
+        if pulltags_df is None:
+            df_budget.columns = [col.strip().replace(" ", "_").lower() for col in df_budget.columns]
+            pulltags_df = generate(df_budget)
+        df_budget = df_budget.assign(upload_hash=upload_hash)
+
+        st.write("🟢 **Step-1 Parsed NPC rows** →", 
+                 df_budget[df_budget["cost_code"] == "NPC"])
 
-            st.write(f"📄 **Lot {lot_number} / Job {job_number} roof={matched_roof}**")
-
-            job_prefix = job_number[:5]
-            for _, budget_row in lot_df.iterrows():
-                budget_code   = budget_row["cost_code"].upper()
-                units_budget  = budget_row["units_budget"]
-                job_prefix     = str(job_number)[:5]
-                matched_roof   = str(matched_roof).strip()
-                budget_code    = str(budget_code).strip().upper()
-                
-                if budget_code == "NPC":
-                    debug_rows = communities_df[
-                        communities_df["item_code"] == "NPC"
-                    ]
-                
-                    st.write("🧪 NPC filter debug", {
-                        "job_prefix": job_prefix,
-                        "matched_roof": matched_roof,
-                        "budget_code": budget_code,
-                    })
-                
-                    test_filtered = debug_rows[
-                        debug_rows["job_number"].str.startswith(job_prefix) &
-                        (debug_rows["roof_type"] == matched_roof) &
-                        (debug_rows["cost_code"] == budget_code)
-                    ]
-                
-                    st.write("🧪 NPC test_filtered rows:", test_filtered)
-
-                community_rows = communities_df[
-                    (communities_df["job_number"].str.startswith(job_prefix)) &
-                    (communities_df["roof_type"] == matched_roof) &
-                    (communities_df["cost_code"].str.strip().str.upper() == budget_code)
-                ]
-
-                # Step-3
-                if budget_code == "NPC":
-                    st.write("🟡 **Step-3 community_rows len** →", len(community_rows))
-
-                for _, comm_row in community_rows.iterrows():
-                    item_code = comm_row["item_code"].strip()
-                    logic     = comm_row["item_code_qty"]
-                    qty       = compute_quantity(units_budget, logic, item_code)
-
-                    # Step-4
-                    if item_code == "NPC":
-                        st.write("🟡 **Step-4 qty debug** →", {"logic": logic, "qty": qty})
-
-                    if qty is None:
-                        continue
-
-                    desc_row = items_master_df[
-                        items_master_df["item_code"].str.strip() == item_code
-                    ]
-                    # Step-5
-                    if item_code == "NPC":
-                        st.write("🟡 **Step-5 desc_row empty?**", desc_row.empty)
-
-                    if desc_row.empty:
-                        continue
-                    desc_row = desc_row.iloc[0]
-
-                    # Step-6  (will append)
-                    if item_code == "NPC":
-                        st.write("🟢 **Step-6 append row**", 
-                                 {"item_code": item_code, "qty": qty})
-
-                    results.append(
-                        dict(
-                            uid=str(uuid.uuid4()),
-                            job_number=job_number,
-                            lot_number=lot_number,
-                            roof_type=matched_roof,
-                            item_code=item_code,
-                            cost_code=budget_code,
-                            description=desc_row["description"],
-                            quantity=qty,
-                            kitted_qty=0,
-                            shorted=0,
-                            backorder_qty=0,
-                            backorder_status="none",
-                            status="pending",
-                            uploaded_on=datetime.utcnow().isoformat(),
-                            requested_on=None,
-                            kitted_on=None,
-                            resolved_on=None,
-                            exported_on=None,
-                            warehouse=None,
-                            uom=desc_row["uom"],
-                            batch_id=None,
-                            updated_by=username,
-                            requested_by=None,
-                        )
-                    )
+        _report_lot_roofs(resolve_lot_roofs(df_budget, roof_index))
 
         # ------------------ preview & submit ------------------
-        pulltags_df = pd.DataFrame(results)
         if pulltags_df.empty:
             st.error("🚫 No pulltags generated.")
             return
 
+        # Stable uids per (job, lot, cost code, item code, upload) so a
+        # re-submit of the same budget is a no-op instead of duplicates
+        pulltags_df["upload_hash"] = upload_hash
+        _assign_uids(pulltags_df)
+
         st.success(f"✅ Generated {len(pulltags_df)} rows.")
         st.dataframe(pulltags_df)
         st.download_button("Download CSV",
                            pulltags_df.to_csv(index=False),
                            "pulltags_generated.csv")
 
-        if st.button("📤 Submit to Supabase"):
-            try:
-                res = supabase.table("pulltags").insert(pulltags_df.to_dict("records")).execute()
-                st.success(f"Inserted {len(res.data or [])} rows.")
-            except Exception as e:
-                st.error(f"Supabase insert failed: {e}")
-
+        _review_and_submit(pulltags_df, df_budget, username)
@@ -1,16 +1,15 @@
 import streamlit as st
 import pandas as pd
-import requests
 import json
 import io
-import os
-from supabase import create_client, Client
+from supabase import Client
+from supabase_client import HTTP_TIMEOUT, get_http_session, get_supabase
 from field_tracker import tracked_input
 
 # ————— Environment / Supabase setup —————
-SUPABASE_URL      = os.environ.get("SUPABASE_URL") or st.secrets.get("SUPABASE_URL")
-SUPABASE_KEY      = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or st.secrets.get("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client  = get_supabase(service_role=True)
+SUPABASE_KEY      = supabase.supabase_key
+http              = get_http_session()  # pooled keep-alive for the edge function
 SUPABASE_EDGE_URL = "https://sxozcdzexeveaqxtgfit.functions.supabase.co/insert_communities"
 
 def run():
@@ -55,8 +54,9 @@ def run():
                     with st.expander(f"⚠️ Submit {len(df)} rows?"):
                         confirm = st.checkbox("I have reviewed the data and wish to proceed")
                         if confirm and st.button("🚀 Submit CSV"):
-                            resp = requests.post(
+                            resp = http.post(
                                 SUPABASE_EDGE_URL,
+                                timeout=HTTP_TIMEOUT,
                                 headers={
                                     "Content-Type": "application/json",
                                     "Authorization": f"Bearer {SUPABASE_KEY}"
@@ -162,8 +162,9 @@ def run():
                         updates.append(row)
     
                     if updates:
-                        resp = requests.post(
+                        resp = http.post(
                             SUPABASE_EDGE_URL,
+                            timeout=HTTP_TIMEOUT,
                             headers={
                                 "Content-Type": "application/json",
                                 "Authorization": f"Bearer {SUPABASE_KEY}",
@@ -222,8 +223,9 @@ def run():
             with st.expander(f"⚠️ Submit {len(df_new)} new rows?"):
                 confirm3 = st.checkbox("I have reviewed and wish to submit")
                 if confirm3 and st.button("🚀 Submit All"):
-                    resp = requests.post(
+                    resp = http.post(
                         SUPABASE_EDGE_URL,
+                        timeout=HTTP_TIMEOUT,
                         headers={
                             "Content-Type": "application/json",
                             "Authorization": f"Bearer {SUPABASE_KEY}"
@@ -1,13 +1,11 @@
-from field_tracker import tracked_input
+from field_tracker import flush_drafts, tracked_input
 import streamlit as st
-from supabase import create_client, Client
-import os
+from supabase import Client
+from supabase_client import get_supabase
 import pandas as pd
 
 # --- Supabase Setup ---
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = get_supabase()
 
 TAB_NAME = "items_editor"
 
@@ -36,6 +34,7 @@ def run():
             submitted = st.form_submit_button("Add Item")
 
             if submitted:
+                flush_drafts(supabase, username, TAB_NAME)
                 if not item_code:
                     st.warning("Item Code is required.")
                 else:
@@ -87,6 +86,7 @@ def run():
                 submitted = st.form_submit_button("Update Item")
 
                 if submitted:
+                    flush_drafts(supabase, username, TAB_NAME)
                     supabase.table("items_master") \
                         .update({
                             "description": new_description,
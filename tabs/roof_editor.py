@@ -1,16 +1,14 @@
 import streamlit as st
 import pandas as pd
-import os
-from supabase import create_client, Client
-from field_tracker import tracked_input  # persistence logic
+from supabase import Client
+from supabase_client import get_supabase
+from field_tracker import flush_drafts, tracked_input  # persistence logic
 
 # --- Constants ---
 TAB_NAME = "roof_editor"
 
 # --- Supabase Init ---
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = get_supabase()
 
 # --- DB Functions ---
 def load_roof_types():
@@ -72,6 +70,7 @@ def run():
         submitted = st.form_submit_button("Add Entry")
 
         if submitted:
+            flush_drafts(supabase, username, TAB_NAME)
             if not roof_type or not cost_code:
                 st.warning("Both fields are required.")
             elif roof_type_exists(roof_type, cost_code):
@@ -98,6 +97,7 @@ def run():
         submitted_del = st.form_submit_button("Delete Entry")
 
         if submitted_del:
+            flush_drafts(supabase, username, TAB_NAME)
             if not roof_type_del or not cost_code_del:
                 st.warning("Both fields are required.")
             else:
@@ -1,19 +1,18 @@
 # ─────────────────────────────────────────────────────────────────────────────
 # pages/sage_export.py – FINAL VERSION with batch export logic and filters
 # ─────────────────────────────────────────────────────────────────────────────
-import io, os, re, random
+import io, re, random
 from datetime import date, datetime
 from pytz import timezone
 import pandas as pd
 import streamlit as st
-from supabase import create_client, Client
+from supabase import Client
+from supabase_client import get_supabase
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Supabase client
 # ─────────────────────────────────────────────────────────────────────────────
-SB_URL = os.environ["SUPABASE_URL"]
-SB_KEY = os.environ["SUPABASE_KEY"]
-supabase: Client = create_client(SB_URL, SB_KEY)
+supabase: Client = get_supabase()
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Init session state
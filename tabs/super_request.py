@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
-import os
 import uuid
 from postgrest.exceptions import APIError   # add near your imports
 from datetime import datetime, timezone
 from fpdf import FPDF
-from supabase import create_client, Client
+from supabase import Client
+from supabase_client import get_supabase
+from bulk_writer import fetch_all
 try:
     # supabase‑py ≥ 2.0
     from postgrest.exceptions import APIError
@@ -15,27 +16,64 @@ except ImportError:
 
 # Helpers
 def get_supabase_client() -> Client:
-    """Create a Supabase client using **only** environment variables (Render safe)."""
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_KEY")
-    if not url or not key:
-        st.error("Supabase credentials not set in environment variables.")
-        st.stop()
-    return create_client(url, key)
+    """The shared, pooled Supabase client (see supabase_client.get_supabase)."""
+    return get_supabase()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_pending_lots(_client, job_number: str) -> list[str]:
+    """Lots of ``job_number`` with pending pulltags (pending_lots view).
 
-@st.cache_data(ttl=300)
-def get_lookup_df(_client):
+    Cached per job; cleared for a job when a batch for it is submitted.
+    """
     try:
-        res = (
-            _client.table("pulltags")
-            .select("job_number, lot_number, status")
-            .execute()
+        rows = fetch_all(
+            lambda: _client.table("pending_lots")
+                           .select("lot_number")
+                           .eq("job_number", job_number)
+                           .order("lot_number")
         )
-        # v2.x succeeds → res is APIResponse, just grab .data
-        return pd.DataFrame(res.data)
     except APIError as e:
         st.error(f"Supabase error {e.code}: {e.message}")
         st.stop()
+    return [row["lot_number"] for row in rows]
+
+def get_live_statuses(client, pairs: list[dict]) -> dict[tuple[str, str], str]:
+    """Live status of each selected (job, lot): "pending" while any of its
+    pulltags still are.  Pairs with no pulltags are left out."""
+    wanted = {(p["job_number"], p["lot_number"]) for p in pairs}
+    jobs = sorted({job for job, _ in wanted})
+    lots = sorted({lot for _, lot in wanted})
+
+    # in_(jobs) × in_(lots) is a superset; the set join keeps selected pairs
+    pending = fetch_all(
+        lambda: client.table("pending_lots")
+                       .select("job_number, lot_number")
+                       .in_("job_number", jobs)
+                       .in_("lot_number", lots)
+                       .order("job_number")
+                       .order("lot_number")
+    )
+    statuses = {
+        pair: "pending"
+        for pair in ((r["job_number"], r["lot_number"]) for r in pending)
+        if pair in wanted
+    }
+
+    # only lots that are no longer pending need their actual status
+    rest = wanted - statuses.keys()
+    if rest:
+        rows = fetch_all(
+            lambda: client.table("pulltags")
+                           .select("job_number, lot_number, status")
+                           .in_("job_number", sorted({job for job, _ in rest}))
+                           .in_("lot_number", sorted({lot for _, lot in rest}))
+                           .order("uid")
+        )
+        for r in rows:
+            pair = (r["job_number"], r["lot_number"])
+            if pair in rest:
+                statuses.setdefault(pair, r["status"])
+    return statuses
 
 def generate_pulltag_pdf(df: pd.DataFrame, title: str | None = None) -> bytes:
     """Return PDF bytes summarising requested pulltags, ordered by lot."""
@@ -81,11 +119,9 @@ def run():
 
     # --- DB client and cache ---
     client = get_supabase_client()
-    lookup_df = get_lookup_df(client)
 
     if st.button("🔄 Refresh cache", type="secondary"):
-        get_lookup_df.clear()
-        lookup_df = get_lookup_df(client)
+        get_pending_lots.clear()
         st.success("Cache refreshed ✅")
 
     tab_new, tab_reprint = st.tabs(["🆕 New Request", "🔁 Re‑print Batch"])
@@ -106,11 +142,7 @@ def run():
         ).strip().upper()
         
         if job_input:
-            lots_available = (
-                lookup_df.query("job_number == @job_input and status == 'pending'")
-                .lot_number.unique()
-                .tolist()
-            )
+            lots_available = get_pending_lots(client, job_input)
         
             if not lots_available:
                 st.info("No pending lots for this job.")
@@ -176,28 +208,19 @@ def run():
             batch_id = f"{user}-{uuid.uuid4().hex[:5].upper()}"
             with st.spinner("Validating & committing…"):
                 # Re‑query live statuses to avoid race conditions
-                filters = " | ".join(
-                    [f"(job_number == '{p['job_number']}' and lot_number == '{p['lot_number']}')"
-                     for p in st.session_state["req_pairs"]]
-                )
-                if filters:
-                    live_res = client.table("pulltags") \
-                                     .select("job_number, lot_number, status") \
-                                     .execute()
-                    live_df = pd.DataFrame(live_res.data).query(filters)
-                else:
-                    live_df = pd.DataFrame()
+                try:
+                    statuses = get_live_statuses(client, st.session_state["req_pairs"])
+                except APIError as e:
+                    st.error(f"Supabase error {e.code}: {e.message}")
+                    st.stop()
         
                 warnings, to_update = [], []
                 for p in st.session_state["req_pairs"]:
-                    row = live_df[
-                        (live_df.job_number == p["job_number"])
-                        & (live_df.lot_number == p["lot_number"])
-                    ]
-                    if row.empty:
+                    status = statuses.get((p["job_number"], p["lot_number"]))
+                    if status is None:
                         warnings.append({**p, "reason": "not found"})
-                    elif row.iloc[0].status != "pending":
-                        warnings.append({**p, "reason": f"already {row.iloc[0].status}"})
+                    elif status != "pending":
+                        warnings.append({**p, "reason": f"already {status}"})
                     else:
                         to_update.append(p)
         
@@ -257,6 +280,8 @@ def run():
                             mime="application/pdf",
                         )
         
+                    for job in {p["job_number"] for p in to_update}:
+                        get_pending_lots.clear(client, job)  # those lots aren't pending any more
                     st.session_state["req_pairs"] = []  # reset selection
 
     # ─────────────────────────────────────────────
@@ -1,13 +1,12 @@
 import streamlit as st
 import bcrypt
-import os
-from supabase import create_client, Client
+from supabase import Client
+from supabase_client import get_supabase
+from auth import invalidate_credentials
 from field_tracker import tracked_input, tracked_text_area, tracked_selectbox
 
 def run():
-    SUPABASE_URL = os.environ.get("SUPABASE_URL")
-    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase: Client = get_supabase()
 
     st.title("👤 User Management")
     tab = "user_management"
@@ -52,6 +51,7 @@ def run():
                         "role": new_role
                     }).execute()
                     st.success(f"User '{new_username}' added.")
+                    load_users.clear(); invalidate_credentials()
                     st.rerun()
                 except Exception as e:
                     st.error(f"Failed to create user: {str(e)}")
@@ -79,6 +79,7 @@ def run():
                     try:
                         supabase.table("users").update(updates).eq("username", edit_user).execute()
                         st.success(f"User '{edit_user}' updated.")
+                        load_users.clear(); invalidate_credentials()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Update failed: {str(e)}")
@@ -100,6 +101,7 @@ def run():
                     try:
                         supabase.table("users").delete().eq("username", user_to_delete).execute()
                         st.success(f"User '{user_to_delete}' deleted.")
+                        load_users.clear(); invalidate_credentials()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Failed to delete user: {str(e)}")
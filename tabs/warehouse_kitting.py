@@ -2,15 +2,12 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from supabase import create_client
-import os
+from supabase_client import get_supabase
 from fpdf import FPDF
 
 
 # Supabase client
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_KEY"]
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = get_supabase()
 #helper function to make a pdf
 def generate_pulltag_pdf(df: pd.DataFrame, title: str | None = None, master_df: pd.DataFrame | None = None) -> bytes:
     """Return PDF bytes summarising requested pulltags, ordered by lot, with optional master summary page."""
@@ -1,11 +1,8 @@
 import streamlit as st
 import pandas as pd
-from supabase import create_client
-import os
+from supabase_client import get_supabase
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_KEY"]
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = get_supabase()
 
 def run():
     st.title("🏢 Manage Warehouses")